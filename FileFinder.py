@@ -5,7 +5,404 @@ from tkinter import filedialog, ttk, scrolledtext, messagebox
 from pathlib import Path
 import openpyxl
 import threading
-from queue import Queue, Empty
+import sqlite3
+import time
+import hashlib
+from queue import Queue, Empty, Full
+from collections import deque
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # ioctl de Linux para clonar un archivo (reflink) en Btrfs/XFS
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 del contenido de un archivo, leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def reflink(src, dst):
+    """Clona src en dst compartiendo bloques (copy-on-write). Lanza OSError si no es posible."""
+    if fcntl is None:
+        raise OSError("reflink no soportado en este sistema")
+    try:
+        with open(src, 'rb') as fs, open(dst, 'wb') as fd:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        raise
+    shutil.copystat(src, dst)
+
+class IdMatcher:
+    """
+    Autómata Aho-Corasick sobre todos los IDs (en minúsculas).
+    Permite encontrar en una sola pasada qué IDs aparecen como subcadena de un nombre.
+    """
+    def __init__(self, ids):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for id_val in ids:
+            self._add(id_val)
+        self._build()
+
+    def _add(self, word):
+        if not word:
+            return
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        if word not in self.output[node]:
+            self.output[node].append(word)
+
+    def _build(self):
+        # Recorrido en anchura para calcular enlaces de fallo y heredar salidas
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                if node:
+                    f = self.fail[node]
+                    while f and ch not in self.goto[f]:
+                        f = self.fail[f]
+                    self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find_all(self, text):
+        """Devuelve el conjunto de IDs contenidos en text."""
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.output[node]:
+                found.update(self.output[node])
+        return found
+
+INDEX_FILENAME = ".filefinder_index.sqlite"
+
+class DirectoryIndex:
+    """
+    Índice persistente (SQLite) de los PDFs del directorio fuente.
+    Guarda ruta, stem, tamaño y mtime de cada PDF, y el mtime de cada carpeta.
+    En cada actualización solo se vuelven a listar las carpetas cuyo mtime cambió.
+    """
+    def __init__(self, source_dir):
+        self.source_dir = Path(source_dir)
+        self.db_path = self.source_dir / INDEX_FILENAME
+        self.conn = sqlite3.connect(str(self.db_path))
+        # Sin archivo de journal en disco: es solo una caché y así no se altera el mtime de la carpeta
+        self.conn.execute("PRAGMA journal_mode=MEMORY")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime REAL
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                dir TEXT,
+                name TEXT,
+                stem TEXT,
+                size INTEGER,
+                mtime REAL,
+                PRIMARY KEY (dir, name)
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def refresh(self, should_stop=lambda: False):
+        """
+        Sincroniza el índice con el disco. Devuelve (carpetas_revisadas, carpetas_relistadas).
+        Las rutas se guardan relativas al directorio fuente.
+        """
+        cached = dict(self.conn.execute("SELECT path, mtime FROM dirs"))
+        seen = set()
+        scanned = rescanned = 0
+        stack = [""]
+        while stack:
+            if should_stop():
+                break
+            rel = stack.pop()
+            full = self.source_dir / rel if rel else self.source_dir
+            try:
+                mtime = os.stat(full).st_mtime
+            except OSError:
+                continue
+            seen.add(rel)
+            scanned += 1
+            if cached.get(rel) == mtime:
+                # Carpeta sin cambios: reutilizar sus subcarpetas y archivos del índice
+                stack.extend(p for (p,) in self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (rel,)))
+                continue
+            rescanned += 1
+            subdirs, files = [], []
+            try:
+                with os.scandir(full) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(os.path.join(rel, entry.name) if rel else entry.name)
+                            elif entry.name.lower().endswith('.pdf') and entry.is_file():
+                                st = entry.stat()
+                                files.append((rel, entry.name, Path(entry.name).stem.lower(), st.st_size, st.st_mtime))
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+            with self.conn:
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (rel,))
+                self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)", files)
+                if not self.conn.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, rel)).rowcount:
+                    self.conn.execute("INSERT INTO dirs VALUES (?, NULL, ?)", (rel, mtime))
+                for sub in subdirs:
+                    # mtime nulo obliga a listar la subcarpeta nueva en este mismo recorrido
+                    self.conn.execute("INSERT OR IGNORE INTO dirs VALUES (?, ?, NULL)", (sub, rel))
+                    self.conn.execute("UPDATE dirs SET parent = ? WHERE path = ?", (rel, sub))
+            stack.extend(subdirs)
+        if not should_stop():
+            # Eliminar carpetas que ya no existen (y sus archivos)
+            gone = [p for (p,) in self.conn.execute("SELECT path FROM dirs") if p not in seen]
+            with self.conn:
+                self.conn.executemany("DELETE FROM files WHERE dir = ?", ((p,) for p in gone))
+                self.conn.executemany("DELETE FROM dirs WHERE path = ?", ((p,) for p in gone))
+        return scanned, rescanned
+
+    def pdfs(self):
+        """Devuelve [(stem_minúsculas, ruta_absoluta)] de todos los PDFs indexados."""
+        return [
+            (stem, self.source_dir / d / name)
+            for d, name, stem in self.conn.execute("SELECT dir, name, stem FROM files ORDER BY dir, name")
+        ]
+
+class CopyEngine:
+    """
+    Copia archivos en paralelo: el hilo de búsqueda encola trabajos en una cola acotada
+    y un grupo de hilos la vacía. Informa el avance (MB/s y archivos/s) mediante log.
+    En modo enlace mantiene un índice (tamaño, hash) de lo que ya hay en el destino para
+    enlazar contra esa copia en lugar de volver a copiar el mismo contenido.
+    """
+    PROGRESS_INTERVAL = 2.0  # segundos entre mensajes de rendimiento
+
+    MODE_COPY = "copy"
+    MODE_LINK = "link"
+
+    def __init__(self, workers, log, should_stop, queue_size=256, mode=MODE_COPY, dest_root=None):
+        self.log = log
+        self.mode = mode
+        self.should_stop = should_stop
+        self.jobs = Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.path_locks = {}
+        self.reserved = set()  # destinos elegidos por un trabajo que aún no terminó de escribirlos
+        self.copied = 0
+        self.errors = 0
+        self.skipped = 0
+        self.bytes_copied = 0
+        # Índice del destino: tamaño -> rutas, y el hash de cada ruta cuando ya se calculó
+        self.dest_by_size = {}
+        self.dest_hashes = {}
+        if mode == self.MODE_LINK and dest_root is not None:
+            self._index_dest(dest_root)
+        self.start_time = time.monotonic()
+        self.last_report = self.start_time
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, src, dst):
+        """Encola una copia. Bloquea si la cola está llena; devuelve False si se pidió detener."""
+        while not self.should_stop():
+            try:
+                self.jobs.put((src, dst), timeout=0.2)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if self.should_stop():
+                continue
+            src, dst = job
+            try:
+                # Dos trabajos con el mismo destino (p. ej. PDFs homónimos de carpetas distintas)
+                # se atienden de uno en uno para que ninguno pise al otro
+                with self._path_lock(dst):
+                    target = self._free_destination(src, dst)
+                    if target is None:
+                        with self.lock:
+                            self.skipped += 1
+                        self.log(f"  = Omitido {src.name}, ya existe en {dst.parent}")
+                        self._maybe_report()
+                        continue
+                    try:
+                        size = os.path.getsize(src)
+                        digest, match = self._find_in_dest(src, size)
+                        if match is not None:
+                            action = self._transfer(match, target) + " desde el destino"
+                        else:
+                            action = self._transfer(src, target)
+                        self._add_to_index(target, size, digest)
+                    finally:
+                        with self.lock:
+                            self.reserved.discard(target)
+                with self.lock:
+                    self.copied += 1
+                    self.bytes_copied += size
+                self.log(f"  ✓ {action} {src.name} a {target.parent}" +
+                         (f" como {target.name}" if target != dst else ""))
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                self.log(f"  ✗ Error copiando {src.name}: {e}")
+            self._maybe_report()
+
+    def _path_lock(self, dst):
+        with self.lock:
+            return self.path_locks.setdefault(dst, threading.Lock())
+
+    def _free_destination(self, src, dst):
+        """
+        Ruta donde dejar src: dst si está libre, None si dst (o una variante nombre_N)
+        ya tiene el mismo contenido, o la primera variante nombre_N libre si dst es otro archivo.
+        La ruta elegida queda reservada hasta terminar la transferencia, así otro trabajo
+        cuyo destino tenga el mismo nombre no puede elegir la misma variante a la vez.
+        """
+        candidate = dst
+        counter = 1
+        while True:
+            with self.lock:
+                if candidate not in self.reserved and not candidate.exists():
+                    self.reserved.add(candidate)
+                    return candidate
+                in_progress = candidate in self.reserved
+            # Una ruta reservada todavía se está escribiendo: no se puede comparar, se pasa a la siguiente
+            if not in_progress and self._already_present(src, candidate):
+                return None
+            candidate = dst.with_name(f"{dst.stem}_{counter}{dst.suffix}")
+            counter += 1
+
+    def _already_present(self, src, dst):
+        """True si dst ya es el mismo archivo que src o tiene el mismo tamaño y contenido."""
+        if not dst.exists():
+            return False
+        if os.path.samefile(src, dst):
+            return True
+        if os.path.getsize(src) != os.path.getsize(dst):
+            return False
+        return file_hash(src) == file_hash(dst)
+
+    def _index_dest(self, dest_root):
+        """Registra por tamaño los archivos que ya hay en el destino; el hash se calcula al necesitarlo."""
+        for root, _, files in os.walk(dest_root):
+            for f in files:
+                path = Path(root) / f
+                try:
+                    self.dest_by_size.setdefault(path.stat().st_size, []).append(path)
+                except OSError:
+                    continue
+
+    def _dest_hash(self, path):
+        digest = self.dest_hashes.get(path)
+        if digest is None:
+            digest = file_hash(path)
+            with self.lock:
+                self.dest_hashes[path] = digest
+        return digest
+
+    def _find_in_dest(self, src, size):
+        """
+        Busca en el índice del destino un archivo con el mismo tamaño y hash que src.
+        Devuelve (hash de src o None si no hizo falta, ruta coincidente o None).
+        Solo en modo enlace: solo ahí sirve enlazar contra la copia del destino.
+        """
+        if self.mode != self.MODE_LINK:
+            return None, None
+        with self.lock:
+            candidates = list(self.dest_by_size.get(size, ()))
+        if not candidates:
+            return None, None
+        digest = file_hash(src)
+        for path in candidates:
+            try:
+                if self._dest_hash(path) == digest:
+                    return digest, path
+            except OSError:
+                continue
+        return digest, None
+
+    def _add_to_index(self, path, size, digest):
+        if self.mode != self.MODE_LINK:
+            return
+        with self.lock:
+            self.dest_by_size.setdefault(size, []).append(path)
+            if digest is not None:
+                self.dest_hashes[path] = digest
+
+    def _transfer(self, src, dst):
+        """Crea dst según el modo: reflink, luego hardlink y, si ambos fallan, copia."""
+        if self.mode == self.MODE_LINK:
+            if dst.exists():
+                dst.unlink()
+            try:
+                reflink(src, dst)
+                return "Clonado (reflink)"
+            except OSError:
+                pass
+            try:
+                os.link(src, dst)
+                return "Enlazado (hardlink)"
+            except OSError:
+                pass
+        shutil.copy2(src, dst)
+        return "Copiado"
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_report < self.PROGRESS_INTERVAL:
+                return
+            self.last_report = now
+        self.log(f"  » {self.throughput()}")
+
+    def throughput(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        with self.lock:
+            copied, bytes_copied = self.copied, self.bytes_copied
+        mb = bytes_copied / (1024 * 1024)
+        return f"{copied} archivos, {mb:.1f} MB en {elapsed:.1f} s ({mb / elapsed:.1f} MB/s, {copied / elapsed:.1f} archivos/s)"
+
+    def close(self):
+        """Espera a que terminen los trabajos pendientes (o se descarten si se pidió detener)."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for t in self.threads:
+            t.join()
+
+# Modos de transferencia que se pueden elegir en la interfaz
+LINK_MODES = ["Copiar", "Enlazar (reflink/hardlink)"]
 
 class FileFinder:
     def __init__(self, root):
@@ -20,6 +417,8 @@ class FileFinder:
         self.id_column = tk.StringVar(value="A")
         self.name_column = tk.StringVar(value="B")
         self.source_dir = tk.StringVar()
+        self.copy_workers = tk.IntVar(value=4)
+        self.link_mode = tk.StringVar(value=LINK_MODES[0])
 
         # Control de threading y estado
         self.stop_requested = False
@@ -50,6 +449,10 @@ class FileFinder:
         ttk.Entry(config_frame, textvariable=self.id_column, width=5).grid(row=1, column=1, sticky="w", padx=5)
         ttk.Label(config_frame, text="Columna NOMBRE:").grid(row=2, column=0, sticky="w")
         ttk.Entry(config_frame, textvariable=self.name_column, width=5).grid(row=2, column=1, sticky="w", padx=5)
+        ttk.Label(config_frame, text="Hilos de copia:").grid(row=3, column=0, sticky="w")
+        ttk.Spinbox(config_frame, from_=1, to=32, textvariable=self.copy_workers, width=5).grid(row=3, column=1, sticky="w", padx=5)
+        ttk.Label(config_frame, text="Modo:").grid(row=4, column=0, sticky="w")
+        ttk.Combobox(config_frame, textvariable=self.link_mode, values=LINK_MODES, state="readonly", width=30).grid(row=4, column=1, sticky="w", padx=5, pady=2)
 
         # Selección de carpeta origen
         dir_frame = ttk.LabelFrame(frame, text="Directorio Fuente", padding=5)
@@ -156,45 +559,87 @@ class FileFinder:
         self._log(f"Registros leídos: {len(data)}")
         return data
 
+    def _scan_pdfs(self):
+        """
+        Devuelve [(stem_minúsculas, ruta)] usando el índice persistente del directorio fuente.
+        Si el índice no se puede usar (p. ej. carpeta de solo lectura), recorre el árbol completo.
+        """
+        try:
+            index = DirectoryIndex(self.source_dir.get())
+            try:
+                self._log(f"Actualizando índice: {index.db_path}")
+                scanned, rescanned = index.refresh(lambda: self.stop_requested)
+                pdfs = index.pdfs()
+            finally:
+                index.close()
+            self._log(f"Carpetas revisadas: {scanned}, re-listadas: {rescanned}, PDFs indexados: {len(pdfs)}")
+            return pdfs
+        except (sqlite3.Error, OSError) as e:
+            self._log(f"  ✗ No se pudo usar el índice ({e}), se recorrerá el directorio completo")
+        return self._walk_pdfs()
+
+    def _walk_pdfs(self):
+        """Recorre el directorio fuente una sola vez y devuelve [(stem_minúsculas, ruta)]."""
+        self._log(f"Indexando PDFs en: {self.source_dir.get()}")
+        pdfs = []
+        for root, _, files in os.walk(self.source_dir.get()):
+            if self.stop_requested:
+                break
+            for f in files:
+                if f.lower().endswith('.pdf'):
+                    pdfs.append((Path(f).stem.lower(), Path(root) / f))
+        self._log(f"PDFs indexados: {len(pdfs)}")
+        return pdfs
+
+    def _match_ids(self, records, pdfs):
+        """
+        Resuelve todos los IDs contra el índice de PDFs en una sola pasada.
+        Devuelve {id_minúsculas: [rutas]} conservando el orden del recorrido.
+        """
+        matcher = IdMatcher({id_val.lower() for id_val, _ in records})
+        matches = {}
+        for stem, path in pdfs:
+            for id_lower in matcher.find_all(stem):
+                matches.setdefault(id_lower, []).append(path)
+        return matches
+
     def _process(self):
         try:
             dest_root = self._create_dest_folder()
             records = self._read_excel()
-            total_copied = 0
-
-            for idx, (id_val, name_val) in enumerate(records, 1):
-                if self.stop_requested:
-                    break
-                self._log(f"[{idx}/{len(records)}] ID={id_val}, NOMBRE={name_val}")
-                folder = dest_root / name_val
-                folder.mkdir(exist_ok=True)
-                # Buscar PDFs
-                found = []
-                for root, _, files in os.walk(self.source_dir.get()):
+            matches = self._match_ids(records, self._scan_pdfs())
+            try:
+                workers = self.copy_workers.get()
+            except tk.TclError:
+                workers = 4
+            mode = CopyEngine.MODE_LINK if self.link_mode.get() == LINK_MODES[1] else CopyEngine.MODE_COPY
+            engine = CopyEngine(workers, self._log, lambda: self.stop_requested, mode=mode, dest_root=dest_root)
+            try:
+                for idx, (id_val, name_val) in enumerate(records, 1):
                     if self.stop_requested:
                         break
-                    for f in files:
-                        if not f.lower().endswith('.pdf'):
-                            continue
-                        if id_val.lower() in Path(f).stem.lower():
-                            found.append(Path(root) / f)
-                    
-                if not found:
-                    self._log(f"  ✗ No se encontró PDF para ID {id_val}")
-                else:
-                    for file_path in found:
-                        if self.stop_requested:
-                            break
-                        try:
-                            shutil.copy2(file_path, folder / file_path.name)
-                            self._log(f"  ✓ Copiado {file_path.name} a {folder}")
-                            total_copied += 1
-                        except Exception as e:
-                            self._log(f"  ✗ Error copiando {file_path.name}: {e}")
+                    self._log(f"[{idx}/{len(records)}] ID={id_val}, NOMBRE={name_val}")
+                    folder = dest_root / name_val
+                    folder.mkdir(exist_ok=True)
+                    # Buscar PDFs en el índice
+                    found = matches.get(id_val.lower(), [])
+                    if not found:
+                        self._log(f"  ✗ No se encontró PDF para ID {id_val}")
+                    else:
+                        for file_path in found:
+                            if not engine.submit(file_path, folder / file_path.name):
+                                break
+            finally:
+                engine.close()
             # Resumen
             self._log("\n--- Resumen ---")
             self._log(f"Total registros: {len(records)}")
-            self._log(f"Total PDFs copiados: {total_copied}")
+            self._log(f"Total PDFs copiados: {engine.copied}")
+            if engine.skipped:
+                self._log(f"PDFs omitidos (ya existían en destino): {engine.skipped}")
+            if engine.errors:
+                self._log(f"Errores de copia: {engine.errors}")
+            self._log(f"Rendimiento: {engine.throughput()}")
             if self.stop_requested:
                 self._log("Proceso detenido por el usuario.")
             else:
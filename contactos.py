@@ -1,66 +1,148 @@
 import pandas as pd
+import numpy as np
 import re
+import os
+import sys
+import time
+import glob
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import freeze_support
+
+try:
+    from pandas._libs.parsers import STR_NA_VALUES
+except ImportError: # API interna de pandas: copia de los valores por defecto de na_values
+    STR_NA_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+                     "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+                     "n/a", "nan", "null"}
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
 
 # Lista de títulos conocidos para ayudar en la identificación
 KNOWN_TITLES_LIST = ["dr.", "dra.", "dr", "dra", "lic.", "ing.", "lic", "ing", "sr.", "sra.", "srta."]
 # Normalizar títulos para comparación (minúsculas, sin punto al final)
 NORMALIZED_TITLES = {t.lower().rstrip('.') for t in KNOWN_TITLES_LIST}
+# Forma preferida de cada título normalizado (la primera que aparece en la lista, ej. "dr" -> "dr.")
+TITLE_CANONICAL = {}
+for _title in KNOWN_TITLES_LIST:
+    TITLE_CANONICAL.setdefault(_title.lower().rstrip('.'), _title)
 
 # Lista de vendedores conocidos (ejemplo)
 KNOWN_VENDORS_LIST = ["ami"]
 NORMALIZED_VENDORS = {v.lower() for v in KNOWN_VENDORS_LIST}
 
+# Columnas que usa la consolidación: A..G (la Etapa está en G, índice 6)
+NUM_COLUMNAS_USADAS = 7
+PLACEHOLDER_ZEROS = ["0.0", ".0", "0"]
+OUTPUT_COLUMNS = ['Serial', 'Título', 'Contacto', 'Teléfono', 'Vendedor', 'Etapa']
+# Columnas de procedencia que añade el modo por lotes
+SOURCE_COLUMNS = ['Archivo', 'Hoja']
+# Procesos del modo por lotes (una hoja por proceso)
+PROCESOS = os.cpu_count() or 1
+# Fila de Excel (1-based) con los encabezados; los datos empiezan en la siguiente
+HEADER_ROW = 2
+# Textos que pd.read_excel lee como celda vacía (na_values por defecto); el modo
+# streaming los trata igual para dar el mismo resultado
+NA_STRINGS = frozenset(STR_NA_VALUES)
+
+# Expresiones precompiladas de los clasificadores
+PHONE_SEPARATORS_RE = re.compile(r'[\s()-]') # Espacios, paréntesis, guiones
+SERIAL_WITH_TEXT_RE = re.compile(r'^\s*(\d+)\s*(.*)$') # Ej: "1 Dr."
+SERIAL_ONLY_RE = re.compile(r'^\s*(\d+)\s*$')          # Ej: "3"
+# Las hojas de campaña repiten mucho los mismos vendedores, etapas y títulos
+CLASSIFIER_CACHE_SIZE = 65536
+
 def is_placeholder_zero(text):
     """Verifica si un texto es un cero placeholder como '0.0', '.0', o '0'."""
     if not isinstance(text, str):
         return False
-    return text in ["0.0", ".0", "0"]
+    return text in PLACEHOLDER_ZEROS
 
 def is_phone_like(text):
     """Verifica si un texto parece un número de teléfono."""
     if not isinstance(text, str):
         return False
+    return _is_phone_like_text(text)
+
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def _is_phone_like_text(text):
     # Si el texto termina en ".0" (común si pandas leyó un float), quitarlo
     if text.endswith(".0"):
         text = text[:-2]
-    cleaned_text = re.sub(r'[\s()-]', '', text) # Eliminar espacios, paréntesis, guiones
+    cleaned_text = PHONE_SEPARATORS_RE.sub('', text)
     return cleaned_text.isdigit() and len(cleaned_text) >= 7
 
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def is_title(word):
+    """Verifica si una palabra es un título conocido (dr, Dra., LIC, ...)."""
+    return word.lower().rstrip('.') in NORMALIZED_TITLES
+
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def is_known_vendor(text):
+    """Verifica si un texto es un vendedor conocido."""
+    return text.lower() in NORMALIZED_VENDORS
+
+def standardize_title(title):
+    """Forma preferida de un título (ej. "DR" -> "dr."); si no es conocido se deja igual."""
+    normalized_title_val = title.lower().rstrip('.')
+    # Buscar en la lista original para mantener el formato preferido (ej. con punto)
+    if normalized_title_val in TITLE_CANONICAL:
+        return TITLE_CANONICAL[normalized_title_val]
+    # Si no se encontró un match exacto en KNOWN_TITLES_LIST pero es una forma válida sin punto
+    if normalized_title_val in ["dr", "dra", "lic", "ing", "sr", "sra", "srta"]:
+        # Capitalize and ensure dot, e.g. "dr" -> "Dr."
+        return normalized_title_val.capitalize() + "."
+    return title
+
 def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
     """
     Consolida múltiples filas (que se asume pertenecen a una misma entrada lógica)
     en un único diccionario estructurado.
     """
+    rows = [
+        [cell_text(row.iloc[k]) if num_cols_in_df > k and pd.notna(row.iloc[k]) else "" for k in range(NUM_COLUMNAS_USADAS)]
+        for row in buffered_rows
+    ]
+    return consolidate_rows(rows)
+
+def consolidate_rows(rows):
+    """
+    Igual que consolidate_buffered_rows, pero cada fila ya es una secuencia de textos
+    limpios (str(...).strip(), "" para celdas vacías) de las columnas A..G.
+    """
     record = {'Serial': '', 'Título': '', 'Contacto': '', 'Teléfono': '', 'Vendedor': '', 'Etapa': ''}
 
-    if not buffered_rows:
+    if len(rows) == 0:
         return record
 
     # --- Procesar la primera fila del buffer para información primaria ---
-    first_row = buffered_rows[0]
-    # Acceder a las celdas usando iloc, verificando que el índice exista en la fila
-    b_val_first = str(first_row.iloc[1]).strip() if num_cols_in_df > 1 and pd.notna(first_row.iloc[1]) else ""
-    c_val_first = str(first_row.iloc[2]).strip() if num_cols_in_df > 2 and pd.notna(first_row.iloc[2]) else ""
+    first_row = rows[0]
+    b_val_first = first_row[1]
+    c_val_first = first_row[2]
     # Asumiendo Etapa está en columna F (índice 5) basado en la imagen de Excel.
     # Si Etapa está en G (índice 6) como el código original sugiere para g_val_first, ajustar aquí.
     # Por ahora, el código original usa iloc[6] (G) para Etapa más adelante.
     # Mantendremos la extracción de Etapa de G para consistencia con la lógica original de `record['Etapa'] = g_val_first`
     # pero es importante que el usuario verifique que esto coincide con su estructura de archivo.
     # `g_val_first` se usa para Etapa.
-    g_val_first = str(first_row.iloc[6]).strip() if num_cols_in_df > 6 and pd.notna(first_row.iloc[6]) else ""
+    g_val_first = first_row[6]
 
 
     # 1. Extraer Serial y Título (principalmente de la columna B)
     if b_val_first:
-        match_num_text = re.match(r'^\s*(\d+)\s*(.*)$', b_val_first) # Ej: "1 Dr."
-        match_just_num = re.match(r'^\s*(\d+)\s*$', b_val_first)     # Ej: "3"
+        match_num_text = SERIAL_WITH_TEXT_RE.match(b_val_first) # Ej: "1 Dr."
+        match_just_num = SERIAL_ONLY_RE.match(b_val_first)     # Ej: "3"
         
         if match_num_text:
             num_part, text_part = match_num_text.groups()
             record['Serial'] = num_part.strip()
             text_part = text_part.strip()
             if text_part:
-                if text_part.lower().rstrip('.') in NORMALIZED_TITLES:
+                if is_title(text_part):
                     record['Título'] = text_part
                 elif not is_placeholder_zero(text_part): # MODIFIED
                     record['Contacto'] = text_part
@@ -69,7 +151,7 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
         else: # b_val_first es solo texto (ej: "Dr. Nombre" o "Nombre")
             parts = b_val_first.split(maxsplit=1)
             first_word = parts[0]
-            if first_word.lower().rstrip('.') in NORMALIZED_TITLES:
+            if is_title(first_word):
                 record['Título'] = first_word
                 if len(parts) > 1:
                     potential_contact = parts[1].strip()
@@ -84,7 +166,7 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
         first_word = parts[0]
         rest_of_c = parts[1].strip() if len(parts) > 1 else ""
 
-        if first_word.lower().rstrip('.') in NORMALIZED_TITLES:
+        if is_title(first_word):
             if not record['Título']: # Si Título no vino de columna B
                 record['Título'] = first_word
             # Si hay más texto y Contacto está vacío, y no es placeholder
@@ -101,15 +183,15 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
         record['Etapa'] = g_val_first
 
     # --- Procesar todas las filas del buffer para Teléfono, Vendedor y rellenar huecos ---
-    for row_data in buffered_rows:
-        # iloc[1] es Col B, iloc[2] es Col C, etc.
-        c_val = str(row_data.iloc[2]).strip() if num_cols_in_df > 2 and pd.notna(row_data.iloc[2]) else ""
-        d_val = str(row_data.iloc[3]).strip() if num_cols_in_df > 3 and pd.notna(row_data.iloc[3]) else ""
-        e_val = str(row_data.iloc[4]).strip() if num_cols_in_df > 4 and pd.notna(row_data.iloc[4]) else ""
-        f_val = str(row_data.iloc[5]).strip() if num_cols_in_df > 5 and pd.notna(row_data.iloc[5]) else ""
+    for row_data in rows:
+        # [1] es Col B, [2] es Col C, etc.
+        c_val = row_data[2]
+        d_val = row_data[3]
+        e_val = row_data[4]
+        f_val = row_data[5]
         # Si Etapa está en F, entonces g_val_row (para Etapa en filas subsecuentes) sería f_val.
-        # Si Etapa está en G (iloc[6]), extraerlo:
-        g_val_row = str(row_data.iloc[6]).strip() if num_cols_in_df > 6 and pd.notna(row_data.iloc[6]) else ""
+        # Si Etapa está en G (índice 6), extraerlo:
+        g_val_row = row_data[6]
 
         # 4. Teléfono (buscar en D, luego E, luego C)
         if not record['Teléfono']:
@@ -124,11 +206,11 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
                 # CAUTION: If F is exclusively Etapa, this line might be problematic.
                 # The original code allows F to be a Vendedor.
                 record['Vendedor'] = f_val
-            elif d_val and not is_phone_like(d_val) and d_val.lower() in NORMALIZED_VENDORS and not is_placeholder_zero(d_val):
+            elif d_val and not is_phone_like(d_val) and is_known_vendor(d_val) and not is_placeholder_zero(d_val):
                 record['Vendedor'] = d_val
         
         # 6. Rellenar Contacto si aún está vacío y D parece un nombre
-        if not record['Contacto'] and d_val and not is_phone_like(d_val) and d_val.lower() not in NORMALIZED_VENDORS:
+        if not record['Contacto'] and d_val and not is_phone_like(d_val) and not is_known_vendor(d_val):
             if not is_placeholder_zero(d_val): # MODIFIED
                 record['Contacto'] = d_val
         
@@ -148,7 +230,7 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
     if record['Contacto'] and not record['Título']:
         contact_parts = record['Contacto'].split(maxsplit=1)
         first_word_contact = contact_parts[0]
-        if first_word_contact.lower().rstrip('.') in NORMALIZED_TITLES:
+        if is_title(first_word_contact):
             record['Título'] = first_word_contact
             potential_new_contact = contact_parts[1].strip() if len(contact_parts) > 1 else ""
             if not is_placeholder_zero(potential_new_contact): # MODIFIED
@@ -158,65 +240,216 @@ def consolidate_buffered_rows(buffered_rows, num_cols_in_df):
     
     # Estandarizar Títulos (ej. "dr" a "Dr.")
     if record['Título']:
-        normalized_title_val = record['Título'].lower().rstrip('.')
-        found_title = False
-        # Buscar en la lista original para mantener el formato preferido (ej. con punto)
-        for known_title_original in KNOWN_TITLES_LIST:
-            if known_title_original.lower().rstrip('.') == normalized_title_val:
-                record['Título'] = known_title_original 
-                found_title = True
-                break
-        # Si no se encontró un match exacto en KNOWN_TITLES_LIST pero es una forma válida sin punto
-        if not found_title and normalized_title_val in ["dr", "dra", "lic", "ing", "sr", "sra", "srta"]:
-             # Capitalize and ensure dot, handling if original already had one then got capitalized
-             temp_title = record['Título'].lower().rstrip('.') # e.g. "dr"
-             capitalized_title = temp_title.capitalize() # e.g. "Dr"
-             record['Título'] = capitalized_title + "." # e.g. "Dr."
-
+        record['Título'] = standardize_title(record['Título'])
 
     return record
 
+def is_new_entry(col_b_val, col_c_val):
+    """Señal de nueva entrada para una sola fila (misma regla que new_entry_signal)."""
+    if col_b_val and not is_placeholder_zero(col_b_val): # Serial/Title in B is a strong signal unless it's "0"
+        return True
+    # Content in C is a signal if B is empty AND C is not just a placeholder
+    if col_c_val and not is_placeholder_zero(col_c_val):
+        return not is_phone_like(col_c_val) and not is_known_vendor(col_c_val)
+    return False
+
+def has_identity(record):
+    """Sólo se conservan registros con Contacto, Serial o Título."""
+    return bool(record.get('Contacto') or record.get('Serial') or record.get('Título'))
+
+def is_integral_float(value):
+    """True para floats enteros (5551234567.0): pandas los lee así en columnas con huecos."""
+    return isinstance(value, float) and value.is_integer()
+
+def cell_text(value):
+    """
+    Texto limpio de una celda: str(valor).strip(), o "" si está vacía. Los floats enteros
+    se escriben sin ".0", como los guarda Excel, para que una columna de teléfonos con
+    huecos (float en pandas) dé el mismo texto que una sin huecos o que el modo streaming.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if is_integral_float(value):
+        return str(int(value))
+    return str(value).strip()
+
+def cell_strings(df):
+    """
+    Matriz NumPy (filas x columnas A..G) con el texto limpio de cada celda (ver cell_text).
+    Se calcula por columnas una sola vez; las columnas que no existen quedan en "".
+    """
+    # df.to_numpy() da los mismos valores (y tipos) que iterrows
+    values = df.to_numpy()
+    num_rows, num_cols = values.shape
+    cells = np.full((num_rows, NUM_COLUMNAS_USADAS), "", dtype=object)
+    for k in range(min(num_cols, NUM_COLUMNAS_USADAS)):
+        column = pd.Series(values[:, k], dtype=object)
+        present = column.notna().to_numpy()
+        texts = column.astype(str).str.strip().to_numpy(dtype=object)
+        integral = column.map(is_integral_float).to_numpy(dtype=bool)
+        if integral.any():
+            texts[integral] = [str(int(v)) for v in values[integral, k]]
+        cells[:, k] = np.where(present, texts, "")
+    return cells
+
+def placeholder_zero_mask(texts):
+    """Versión vectorizada de is_placeholder_zero para una Series de textos."""
+    return texts.isin(PLACEHOLDER_ZEROS)
+
+def phone_like_mask(texts):
+    """Versión vectorizada de is_phone_like para una Series de textos."""
+    cleaned = texts.str.replace(r'\.0$', '', regex=True).str.replace(PHONE_SEPARATORS_RE, '', regex=True)
+    return cleaned.str.isdigit() & (cleaned.str.len() >= 7)
+
+def new_entry_signal(cells):
+    """
+    Serie booleana: True donde empieza una nueva entrada lógica.
+    Un Serial/Título en B es señal salvo que sea un cero placeholder; si no, cuenta el
+    contenido de C cuando no es placeholder, teléfono ni vendedor conocido.
+    """
+    col_b = pd.Series(cells[:, 1], dtype=object)
+    col_c = pd.Series(cells[:, 2], dtype=object)
+    signal_b = (col_b != "") & ~placeholder_zero_mask(col_b)
+    signal_c = ((col_c != "") & ~placeholder_zero_mask(col_c)
+                & ~phone_like_mask(col_c) & ~col_c.str.lower().isin(NORMALIZED_VENDORS))
+    return signal_b | signal_c
+
 def process_excel_data(df):
     """
     Procesa el DataFrame de entrada, agrupando filas y consolidándolas.
+    La señal de nueva entrada se calcula por columnas y cada grupo (suma acumulada de
+    la señal) se consolida sobre la matriz de textos ya limpios.
     """
     processed_records = []
-    current_record_rows_buffer = []
-    num_cols = df.shape[1]
-
-    for index, row in df.iterrows():
-        col_b_val = str(row.iloc[1]).strip() if num_cols > 1 and pd.notna(row.iloc[1]) else ""
-        col_c_val = str(row.iloc[2]).strip() if num_cols > 2 and pd.notna(row.iloc[2]) else ""
-
-        is_new_entry_signal = False
-        # Consider placeholder zero as not a strong signal for new entry if it's the only content in C
-        is_c_val_placeholder = is_placeholder_zero(col_c_val)
-
-        if col_b_val and not is_placeholder_zero(col_b_val): # Serial/Title in B is a strong signal unless it's "0"
-            is_new_entry_signal = True
-        elif col_c_val and not is_c_val_placeholder: # Content in C is a signal if B is empty AND C is not just a placeholder
-            if not is_phone_like(col_c_val) and col_c_val.lower() not in NORMALIZED_VENDORS:
-                is_new_entry_signal = True
-        
-        if is_new_entry_signal and current_record_rows_buffer:
-            consolidated = consolidate_buffered_rows(current_record_rows_buffer, num_cols)
-            if consolidated.get('Contacto') or consolidated.get('Serial') or consolidated.get('Título'): # Added Título
-                processed_records.append(consolidated)
-            current_record_rows_buffer = []
-        
-        current_record_rows_buffer.append(row)
+    if df.shape[0] == 0:
+        return pd.DataFrame(processed_records)
+
+    cells = cell_strings(df)
+    group_ids = new_entry_signal(cells).cumsum().to_numpy()
+    # Inicio de cada grupo: la primera fila y cada fila donde cambia el id
+    starts = np.flatnonzero(np.diff(group_ids, prepend=group_ids[0] - 1))
+    ends = np.append(starts[1:], len(cells))
 
-    if current_record_rows_buffer:
-        consolidated = consolidate_buffered_rows(current_record_rows_buffer, num_cols)
-        if consolidated.get('Contacto') or consolidated.get('Serial') or consolidated.get('Título'): # Added Título
+    for start, end in zip(starts, ends):
+        consolidated = consolidate_rows(cells[start:end])
+        if has_identity(consolidated):
             processed_records.append(consolidated)
             
     return pd.DataFrame(processed_records)
 
-def run_formatter(file_path, sheet_name):
+def iter_sheet_rows(file_path, sheet_name, header_row=HEADER_ROW):
+    """
+    Lee las filas de datos de una hoja en modo read_only/values_only de openpyxl,
+    una a una, sin cargar la hoja completa en memoria.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name]
+        # Algunos xlsx traen mal la dimensión guardada; sin esto read_only puede cortar filas
+        sheet.reset_dimensions()
+        yield from sheet.iter_rows(min_row=header_row + 1, values_only=True)
+    finally:
+        workbook.close()
+
+def iter_records(rows):
+    """
+    Máquina de estados incremental: recibe filas (tuplas de valores) y emite cada
+    registro consolidado en cuanto empieza la siguiente entrada.
+    """
+    buffer = []
+    for values in rows:
+        # Como pd.read_excel: "NA", "#N/A", "null"... cuentan como celdas vacías
+        values = [None if isinstance(v, str) and v in NA_STRINGS else v for v in values]
+        # Equivalente a dropna(how='all'): ignorar filas completamente vacías
+        if all(v is None for v in values):
+            continue
+        cells = [cell_text(v) for v in values[:NUM_COLUMNAS_USADAS]]
+        cells.extend([""] * (NUM_COLUMNAS_USADAS - len(cells)))
+
+        if is_new_entry(cells[1], cells[2]) and buffer:
+            consolidated = consolidate_rows(buffer)
+            if has_identity(consolidated):
+                yield consolidated
+            buffer = []
+        buffer.append(cells)
+
+    if buffer:
+        consolidated = consolidate_rows(buffer)
+        if has_identity(consolidated):
+            yield consolidated
+
+def stream_formatter(file_path, sheet_name):
+    """
+    Modo streaming: genera los registros consolidados de una hoja con memoria acotada.
+    Da los mismos registros que la lectura con pandas (ver cell_text).
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise ImportError("El modo streaming necesita openpyxl: pip install openpyxl")
+    return iter_records(iter_sheet_rows(file_path, sheet_name))
+
+def benchmark_classifiers(num_cells=200000, seed=0):
+    """
+    Micro-benchmark de los clasificadores: compara la versión anterior (re.sub sin
+    precompilar, recorrido de KNOWN_TITLES_LIST) con la actual (regex precompilada,
+    búsqueda en diccionario y caché LRU) sobre celdas que se repiten como en una campaña.
+    """
+    import random
+    rng = random.Random(seed)
+    sample = (["555-123-4567", "(55) 1234 5678", "5512345678.0", "ami", "Cliente", "Prospecto",
+               "Dr.", "dra", "LIC", "Juan Pérez", "0", "Cotización enviada"]
+              + [f"55{rng.randint(10000000, 99999999)}" for _ in range(500)])
+    cells = [rng.choice(sample) for _ in range(num_cells)]
+    titles = [rng.choice(KNOWN_TITLES_LIST + ["DR", "Ing", "Srta"]) for _ in range(num_cells)]
+
+    def phone_like_before(text):
+        if text.endswith(".0"):
+            text = text[:-2]
+        cleaned_text = re.sub(r'[\s()-]', '', text)
+        return cleaned_text.isdigit() and len(cleaned_text) >= 7
+
+    def title_before(title):
+        normalized_title_val = title.lower().rstrip('.')
+        for known_title_original in KNOWN_TITLES_LIST:
+            if known_title_original.lower().rstrip('.') == normalized_title_val:
+                return known_title_original
+        return title
+
+    def measure(function, values):
+        t0 = time.perf_counter()
+        for value in values:
+            function(value)
+        return time.perf_counter() - t0
+
+    _is_phone_like_text.cache_clear()
+    results = [
+        ("is_phone_like", measure(phone_like_before, cells), measure(is_phone_like, cells)),
+        ("título estándar", measure(title_before, titles), measure(standardize_title, titles)),
+    ]
+    print(f"Micro-benchmark de clasificadores ({num_cells} celdas):")
+    for name, before, after in results:
+        print(f"  {name:<16} antes: {before * 1e9 / num_cells:7.0f} ns/celda   "
+              f"ahora: {after * 1e9 / num_cells:7.0f} ns/celda   ({before / after:.1f}x)")
+    return results
+
+def run_formatter(file_path, sheet_name, streaming=False):
     """
     Función principal para cargar, procesar y devolver los datos formateados.
+    Con streaming=True la hoja se lee fila a fila (openpyxl read_only) en lugar de
+    cargarla entera con pandas; sólo los registros consolidados quedan en memoria.
     """
+    if streaming:
+        print(f"Procesando hoja '{sheet_name}' del archivo '{file_path}' (streaming)...")
+        try:
+            records = list(stream_formatter(file_path, sheet_name))
+        except FileNotFoundError:
+            print(f"Error: El archivo '{file_path}' no fue encontrado.")
+            return None
+        except Exception as e:
+            print(f"Error al leer el archivo Excel o la hoja especificada: {e}")
+            return None
+        print("Procesamiento completado.")
+        return pd.DataFrame(records, columns=OUTPUT_COLUMNS)
+
     try:
         # La imagen muestra encabezados en la fila 2 de Excel.
         # Pandas usa indexación 0, así que header=1 significa que la fila 2 es el encabezado.
@@ -237,26 +470,154 @@ def run_formatter(file_path, sheet_name):
     df.dropna(how='all', inplace=True)
     if df.empty:
         print(f"Advertencia: La hoja '{sheet_name}' está vacía después de eliminar filas completamente vacías.")
-        return pd.DataFrame(columns=['Serial', 'Título', 'Contacto', 'Teléfono', 'Vendedor', 'Etapa'])
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
 
-    processed_df = process_excel_data(df.copy()) 
+    # process_excel_data no modifica el DataFrame, no hace falta copiarlo
+    processed_df = process_excel_data(df)
 
-    output_columns = ['Serial', 'Título', 'Contacto', 'Teléfono', 'Vendedor', 'Etapa']
-    
     if not processed_df.empty:
-        final_df = processed_df.reindex(columns=output_columns).fillna('')
+        final_df = processed_df.reindex(columns=OUTPUT_COLUMNS).fillna('')
     else:
-        final_df = pd.DataFrame(columns=output_columns)
+        final_df = pd.DataFrame(columns=OUTPUT_COLUMNS)
 
     print("Procesamiento completado.")
     return final_df
 
+def find_workbooks(paths):
+    """Expande directorios (recursivo) y patrones glob a una lista ordenada de .xlsx sin repetidos."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in files if f.lower().endswith(".xlsx"))
+        else:
+            found.extend(f for f in glob.glob(path, recursive=True) if f.lower().endswith(".xlsx"))
+    # Excel deja archivos de bloqueo "~$nombre.xlsx" mientras el libro está abierto
+    return sorted({os.path.abspath(f) for f in found if not os.path.basename(f).startswith("~$")})
+
+def source_names(workbooks):
+    """
+    {ruta: nombre para la columna Archivo}: la ruta relativa a la carpeta común de todos los
+    libros del lote, así dos libros con el mismo nombre en carpetas distintas no se confunden.
+    """
+    if not workbooks:
+        return {}
+    try:
+        root = os.path.commonpath([os.path.dirname(f) for f in workbooks])
+    except ValueError: # Libros en unidades distintas (Windows): no hay carpeta común
+        return {f: f for f in workbooks}
+    return {f: os.path.relpath(f, root) for f in workbooks}
+
+def list_sheets(file_path):
+    """Nombres de las hojas de un libro sin cargar su contenido."""
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def _format_sheet_job(file_path, sheet_name, streaming, source_name=None):
+    """
+    Trabajador del modo por lotes: formatea una hoja y añade las columnas de procedencia.
+    `source_name` es el valor de la columna Archivo (por defecto, el nombre del libro).
+    """
+    t0 = time.perf_counter()
+    try:
+        df = run_formatter(file_path, sheet_name, streaming=streaming)
+        error = None if df is not None else "no se pudo leer la hoja"
+    except Exception as e:
+        df, error = None, str(e)
+    if df is not None:
+        df = df.reindex(columns=OUTPUT_COLUMNS).fillna('')
+        df.insert(0, 'Hoja', sheet_name)
+        df.insert(0, 'Archivo', source_name or os.path.basename(file_path))
+    return file_path, sheet_name, df, error, time.perf_counter() - t0
+
+def write_output(df, output_path):
+    """Escribe el resultado una sola vez, en Parquet o CSV según la extensión."""
+    if output_path.lower().endswith(".parquet"):
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False, encoding="utf-8-sig")
+
+def main_lote(argv):
+    """
+    Formatea todas las hojas de varios libros en paralelo (una hoja por proceso) y
+    escribe un único archivo con las columnas Archivo y Hoja. Devuelve 0 si todo
+    salió bien y 1 si alguna hoja falló.
+    """
+    parser = argparse.ArgumentParser(prog="contactos --lote", description="Formatea varios libros y hojas de campaña a la vez.")
+    parser.add_argument("rutas", nargs="+", help="Archivos .xlsx, directorios o patrones glob (p. ej. 'campañas/*.xlsx')")
+    parser.add_argument("--hojas", nargs="+", help="Sólo estas hojas (por defecto, todas las de cada libro)")
+    parser.add_argument("--salida", default="datos_procesados.csv", help="Archivo de salida (.csv o .parquet)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Número de hojas procesadas a la vez")
+    parser.add_argument("--streaming", action="store_true", help="Leer cada hoja fila a fila (memoria acotada)")
+    args = parser.parse_args(argv)
+
+    if not OPENPYXL_AVAILABLE:
+        print("El modo por lotes necesita openpyxl: pip install openpyxl")
+        return 1
+
+    workbooks = find_workbooks(args.rutas)
+    if not workbooks:
+        print("No se encontraron archivos .xlsx.")
+        return 1
+
+    names = source_names(workbooks)
+    jobs = []
+    failures = 0
+    for file_path in workbooks:
+        try:
+            sheets = list_sheets(file_path)
+        except Exception as e:
+            print(f"ERROR {file_path}: {e}")
+            failures += 1
+            continue
+        jobs.extend((file_path, sheet) for sheet in sheets if not args.hojas or sheet in args.hojas)
+    print(f"Procesando {len(jobs)} hojas de {len(workbooks)} libros con {args.procesos} procesos...")
+
+    results = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.procesos)) as executor:
+        futures = [executor.submit(_format_sheet_job, file_path, sheet, args.streaming, names[file_path])
+                   for file_path, sheet in jobs]
+        for future in as_completed(futures):
+            file_path, sheet_name, df, error, seconds = future.result()
+            if error is not None:
+                failures += 1
+                print(f"ERROR {file_path} [{sheet_name}]: {error}")
+                continue
+            print(f"OK {file_path} [{sheet_name}]: {len(df)} registros en {seconds:.1f} s")
+            results[(file_path, sheet_name)] = df
+
+    # Orden estable (libro y orden de las hojas) sin importar qué proceso terminó primero
+    frames = [results[job] for job in jobs if job in results]
+    if frames:
+        merged = pd.concat(frames, ignore_index=True)
+    else:
+        merged = pd.DataFrame(columns=SOURCE_COLUMNS + OUTPUT_COLUMNS)
+    write_output(merged, args.salida)
+    print(f"{len(merged)} registros guardados en: {args.salida}")
+    print(f"Tiempo total: {time.perf_counter() - t0:.1f} s. Fallos: {failures}")
+    return 1 if failures else 0
+
 if __name__ == '__main__':
+    freeze_support() # Necesario para el pool de procesos en el ejecutable de Windows
+    if len(sys.argv) > 1 and sys.argv[1] == "--lote":
+        # Uso: contactos.py --lote <archivos|carpetas|patrones> [--hojas h1 h2] [--salida datos.csv|datos.parquet]
+        sys.exit(main_lote(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        # Uso: contactos.py --benchmark
+        benchmark_classifiers()
+        sys.exit(0)
+
     # --- CONFIGURACIÓN ---
     archivo_excel = "1.xlsx" 
     nombre_hoja = "one"            
+    # True para hojas muy grandes: lectura fila a fila con memoria acotada
+    modo_streaming = False
     
-    formatted_data = run_formatter(archivo_excel, nombre_hoja)
+    formatted_data = run_formatter(archivo_excel, nombre_hoja, streaming=modo_streaming)
     
     if formatted_data is not None:
         if not formatted_data.empty:
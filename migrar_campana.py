@@ -5,11 +5,44 @@ Llena tanto la hoja de Clientes como la de Leads con la información adaptada
 """
 
 import pandas as pd
+import numpy as np
 import openpyxl
 from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
 import re
+import math
+import os
+import sys
+import time
+import shutil
+import numbers
+import zipfile
+import tempfile
+import tracemalloc
+import posixpath
+import html
+from xml.sax.saxutils import escape
 from datetime import datetime
 
+# Etapas de ventas normalizadas (la clave es la etapa ya sin espacios sobrantes)
+STAGE_MAPPING = {
+    "Nuevo": "Nuevo",
+    "Reconocimiento de necesidades": "Reconocimiento de necesidades",
+    "Reconocimiento de necesidades ": "Reconocimiento de necesidades",  # Con espacio extra
+    "Presentación de cotización": "Presentación de cotización",
+    "Negociación final": "Negociación final",
+    "Negociación Final": "Negociación final",  # Normalizar capitalización
+    "Ganado": "Ganado",
+    "Perdido": "Perdido"
+}
+
+VENDOR_SUFFIX_PATTERN = r'\.\s*(NUEVO|nuevo).*$'
+
+# Filas por bloque al escribir el XML de las hojas de la plantilla
+WRITER_CHUNK_ROWS = 5000
+
 def clean_phone_number(phone):
     """Limpia y formatea números telefónicos"""
     if pd.isna(phone):
@@ -24,7 +57,7 @@ def clean_vendor_name(vendor):
     if pd.isna(vendor):
         return ""
     # Eliminar sufijos como ".NUEVO", ".   NUEVO", etc.
-    cleaned = re.sub(r'\.\s*(NUEVO|nuevo).*$', '', str(vendor))
+    cleaned = re.sub(VENDOR_SUFFIX_PATTERN, '', str(vendor))
     return cleaned.strip()
 
 def normalize_stage(stage):
@@ -32,18 +65,7 @@ def normalize_stage(stage):
     if pd.isna(stage):
         return ""
     
-    stage_mapping = {
-        "Nuevo": "Nuevo",
-        "Reconocimiento de necesidades": "Reconocimiento de necesidades",
-        "Reconocimiento de necesidades ": "Reconocimiento de necesidades",  # Con espacio extra
-        "Presentación de cotización": "Presentación de cotización",
-        "Negociación final": "Negociación final",
-        "Negociación Final": "Negociación final",  # Normalizar capitalización
-        "Ganado": "Ganado",
-        "Perdido": "Perdido"
-    }
-    
-    return stage_mapping.get(str(stage).strip(), str(stage).strip())
+    return STAGE_MAPPING.get(str(stage).strip(), str(stage).strip())
 
 # MODIFICADO: Esta función ya no es necesaria para determinar el tipo de cliente en la salida,
 # ya que se ha fijado a persona física (2). Se mantiene por si se requiere en el futuro
@@ -87,6 +109,54 @@ def generate_opportunity_description(contact_name, stage, vendor): # stage and v
         return ""  # Si no hay nombre de contacto, devuelve una cadena vacía
     return str(contact_name).strip()
 
+# --- Versiones vectorizadas (columna completa) de los limpiadores anteriores ---
+
+def _as_text(series):
+    """str(valor) de cada celda; las vacías quedan como "" (se enmascaran aparte)."""
+    return series.astype(object).where(series.notna(), "").astype(str)
+
+def clean_phone_numbers(phones):
+    """clean_phone_number sobre una columna completa."""
+    present = phones.notna()
+    texts = _as_text(phones)
+    # Los números leídos como float se pasan a entero antes de convertirlos a texto (5551234567.0 -> 5551234567)
+    if pd.api.types.is_float_dtype(phones.dtype):
+        is_float = present
+    else:
+        is_float = present & phones.map(lambda v: isinstance(v, float))
+    if is_float.any():
+        floats = phones[is_float].astype(float)
+        # astype('int64') sólo es exacto dentro de su rango; fuera de él (o inf) se usa int() de Python
+        in_range = floats.abs() < 2.0 ** 63
+        as_int = pd.Series("", index=floats.index, dtype=object)
+        as_int[in_range] = floats[in_range].astype('int64').astype(str)
+        as_int[~in_range] = floats[~in_range].map(lambda v: str(int(v)) if math.isfinite(v) else "")
+        texts = texts.where(~is_float, as_int)
+    cleaned = texts.str.replace(r'[^\d+]', '', regex=True)
+    return cleaned.where(present, "")
+
+def clean_vendor_names(vendors):
+    """clean_vendor_name sobre una columna completa."""
+    cleaned = _as_text(vendors).str.replace(VENDOR_SUFFIX_PATTERN, '', regex=True).str.strip()
+    return cleaned.where(vendors.notna(), "")
+
+def normalize_stages(stages):
+    """normalize_stage sobre una columna completa."""
+    stripped = _as_text(stages).str.strip()
+    normalized = stripped.map(STAGE_MAPPING).fillna(stripped)
+    return normalized.where(stages.notna(), "")
+
+def create_display_names(titles, contact_names):
+    """create_display_name sobre dos columnas completas."""
+    contacts = _as_text(contact_names).str.strip()
+    combined = (_as_text(titles).str.strip() + " " + contacts).str.strip()
+    names = np.where(contact_names.isna(), "", np.where(titles.isna(), contacts, combined))
+    return pd.Series(names, index=contact_names.index, dtype=object)
+
+def generate_opportunity_descriptions(contact_names):
+    """generate_opportunity_description sobre una columna completa."""
+    return _as_text(contact_names).str.strip().where(contact_names.notna(), "")
+
 # MODIFICADO: Esta función ya no es necesaria para determinar las etiquetas,
 # ya que se ha fijado a "MRC3D 1". Se mantiene por si se requiere en el futuro
 # para otros propósitos o para entender la lógica original.
@@ -112,6 +182,169 @@ def generate_opportunity_description(contact_name, stage, vendor): # stage and v
 #     else:
 #         return "Prospecto"
 
+# --- Escritura de filas en la plantilla ---
+
+def write_rows_cellwise(worksheet, rows):
+    """Escritura anterior: borra las filas de datos y escribe celda por celda con openpyxl."""
+    if worksheet.max_row > 1: # Check if there's data beyond headers
+        worksheet.delete_rows(2, worksheet.max_row -1) # Delete existing data rows
+
+    for i, row in enumerate(rows, start=2): # Start from row 2 (after headers)
+        for j, valor in enumerate(row, start=1):
+            worksheet.cell(row=i, column=j, value=valor)
+
+def _sheet_xml_paths(template_zip):
+    """{nombre de hoja: ruta del XML dentro del xlsx} leyendo workbook.xml y sus relaciones."""
+    workbook_xml = template_zip.read("xl/workbook.xml").decode("utf-8")
+    rels_xml = template_zip.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    targets = {}
+    for rel in re.finditer(r'<(?:\w+:)?Relationship\b[^>]*>', rels_xml):
+        rel_id = re.search(r'\bId="([^"]+)"', rel.group(0))
+        target = re.search(r'\bTarget="([^"]+)"', rel.group(0))
+        if rel_id and target:
+            path = target.group(1)
+            path = path.lstrip("/") if path.startswith("/") else posixpath.normpath(posixpath.join("xl", path))
+            targets[rel_id.group(1)] = path
+    paths = {}
+    for sheet in re.finditer(r'<(?:\w+:)?sheet\b[^>]*>', workbook_xml):
+        name = re.search(r'\bname="([^"]*)"', sheet.group(0))
+        rel_id = re.search(r'\br:id="([^"]+)"', sheet.group(0))
+        if name and rel_id and rel_id.group(1) in targets:
+            # Entidades con nombre y numéricas (&amp;, &apos;, &#38;...) como las decodifica openpyxl
+            paths[html.unescape(name.group(1))] = targets[rel_id.group(1)]
+    return paths
+
+def _cell_xml(ref, value):
+    """
+    XML de una celda con el mismo criterio de tipos que openpyxl; None, "" y los números
+    no finitos (nan, inf) no generan celda, ya que Excel no admite esos valores en <v>.
+    """
+    if value is None:
+        return ""
+    # Los escalares de NumPy (np.bool_, np.int64, np.float64...) se escriben como los de Python
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Number):
+        if not math.isfinite(value):
+            return ""
+        texto = repr(float(value)) if isinstance(value, numbers.Real) else str(value)
+        return f'<c r="{ref}"><v>{texto}</v></c>'
+    text = str(value)
+    if text == "":
+        return ""
+    if ILLEGAL_CHARACTERS_RE.search(text):
+        raise IllegalCharacterError(f"{text} cannot be used in worksheets.")
+    if text.startswith("=") and len(text) > 1:
+        # openpyxl guarda los textos que empiezan con "=" como fórmulas
+        return f'<c r="{ref}"><f>{escape(text[1:])}</f></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+def _rows_xml(rows, first_row, num_columns):
+    """Genera el XML de las filas de datos por bloques de WRITER_CHUNK_ROWS filas."""
+    letters = [get_column_letter(j) for j in range(1, num_columns + 1)]
+    chunk = []
+    for row_number, row in enumerate(rows, start=first_row):
+        cells = "".join(_cell_xml(f"{letters[j]}{row_number}", value) for j, value in enumerate(row))
+        chunk.append(f'<row r="{row_number}">{cells}</row>')
+        if len(chunk) >= WRITER_CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+def _split_sheet_xml(xml, sheet_name):
+    """
+    Separa el XML de una hoja en (antes de las filas de datos, después de ellas) conservando
+    la fila 1 (encabezados) tal como está en la plantilla.
+    """
+    match = re.search(r'<((?:\w+:)?)sheetData\b([^>]*?)(?:/>|>(.*?)</(?:\w+:)?sheetData>)', xml, re.S)
+    if not match:
+        raise ValueError(f"La hoja '{sheet_name}' de la plantilla no tiene sheetData")
+    ns_prefix, attributes, content = match.group(1), match.group(2), match.group(3) or ""
+    header_match = re.search(r'<(?:\w+:)?row\b[^>]*\br="1"[^>]*?(?:/>|>.*?</(?:\w+:)?row>)', content, re.S)
+    header = header_match.group(0) if header_match else ""
+    before = xml[:match.start()] + f"<{ns_prefix}sheetData{attributes}>" + header
+    after = f"</{ns_prefix}sheetData>" + xml[match.end():]
+    return before, after
+
+def write_template_bulk(template_file, output_file, sheets_rows):
+    """
+    Copia la plantilla tal cual (estilos, anchos, validaciones, otras hojas) y sólo reemplaza
+    las filas de datos de las hojas indicadas. Se conserva la fila 1 (encabezados) del XML
+    original y las filas nuevas se escriben por bloques directamente en el xlsx de salida,
+    sin crear un objeto celda por valor.
+    sheets_rows: {nombre de hoja: lista de filas (tuplas)}; todas las filas de una hoja
+    tienen el mismo número de columnas.
+    """
+    with zipfile.ZipFile(template_file) as template_zip:
+        sheet_paths = _sheet_xml_paths(template_zip)
+        targets = {}
+        for sheet_name in sheets_rows:
+            if sheet_name not in sheet_paths:
+                raise KeyError(f"La hoja '{sheet_name}' no existe en la plantilla")
+            targets[sheet_paths[sheet_name]] = sheet_name
+
+        with zipfile.ZipFile(output_file, "w", zipfile.ZIP_DEFLATED) as output_zip:
+            for info in template_zip.infolist():
+                if info.filename not in targets:
+                    with template_zip.open(info) as src, output_zip.open(info, "w") as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    continue
+
+                sheet_name = targets[info.filename]
+                rows = sheets_rows[sheet_name]
+                num_columns = len(rows[0]) if len(rows) else 1
+                before, after = _split_sheet_xml(template_zip.read(info).decode("utf-8"), sheet_name)
+                # La dimensión guardada es el rango usado: encabezados más las filas nuevas
+                dimension = f"A1:{get_column_letter(num_columns)}{len(rows) + 1}"
+                before = re.sub(r'(<(?:\w+:)?dimension\b[^>]*\bref=")[^"]*(")', rf'\g<1>{dimension}\g<2>', before, count=1)
+
+                info_out = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                info_out.compress_type = zipfile.ZIP_DEFLATED
+                with output_zip.open(info_out, "w") as dst:
+                    dst.write(before.encode("utf-8"))
+                    for rows_xml in _rows_xml(rows, 2, num_columns):
+                        dst.write(rows_xml.encode("utf-8"))
+                    dst.write(after.encode("utf-8"))
+
+def benchmark_writers(template_file, num_rows=100000):
+    """
+    Compara la escritura celda por celda con openpyxl y la escritura por bloques en el XML:
+    tiempo total (carga + escritura + guardado) y pico de memoria medido con tracemalloc
+    en una segunda ejecución.
+    """
+    row = (2, "Dr. Juan Pérez", "5551234567", "", "Juan Pérez", "Teléfono", "", "", "", "",
+           "", "", "", "México", "Ana", 1, "", "")
+    rows = [row] * num_rows
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        def cellwise(path):
+            workbook = load_workbook(template_file)
+            write_rows_cellwise(workbook['Clientes'], rows)
+            workbook.save(path)
+
+        def bulk(path):
+            write_template_bulk(template_file, path, {'Clientes': rows})
+
+        for name, writer in (("celda por celda", cellwise), ("por bloques", bulk)):
+            path = os.path.join(tmp, f"{name}.xlsx")
+            t0 = time.perf_counter()
+            writer(path)
+            seconds = time.perf_counter() - t0
+            # Segunda pasada sólo para la memoria: tracemalloc ralentiza y falsearía el tiempo
+            tracemalloc.start()
+            writer(path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((name, seconds, peak, os.path.getsize(path)))
+
+    print(f"Escritura de {num_rows} filas en la hoja Clientes de '{template_file}':")
+    for name, seconds, peak, size in results:
+        print(f"  {name:<16} {seconds:6.2f} s   pico de memoria {peak / (1024 * 1024):7.1f} MB   archivo {size / 1024:,.0f} KB")
+    return results
+
 def migrate_campaign_to_template(campaign_file, template_file, output_file):
     """
     Función principal que migra los datos de campaña al formato de plantilla
@@ -123,94 +356,59 @@ def migrate_campaign_to_template(campaign_file, template_file, output_file):
     print(f"Se encontraron {len(campaign_df)} registros en la campaña")
     
     print("Limpiando y preparando datos...")
-    campaign_df['Teléfono_Clean'] = campaign_df['Teléfono'].apply(clean_phone_number)
-    campaign_df['Vendedor_Clean'] = campaign_df['Vendedor'].apply(clean_vendor_name)
-    campaign_df['Etapa_Clean'] = campaign_df['Etapa'].apply(normalize_stage)
-    campaign_df['Nombre_Mostrado'] = campaign_df.apply(
-        lambda row: create_display_name(row['Título'], row['Contacto']), axis=1
-    )
+    campaign_df['Teléfono_Clean'] = clean_phone_numbers(campaign_df['Teléfono'])
+    campaign_df['Vendedor_Clean'] = clean_vendor_names(campaign_df['Vendedor'])
+    campaign_df['Etapa_Clean'] = normalize_stages(campaign_df['Etapa'])
+    campaign_df['Nombre_Mostrado'] = create_display_names(campaign_df['Título'], campaign_df['Contacto'])
     # MODIFICADO: Ya no se pre-calcula 'Tipo_Cliente' aquí, se asigna directamente.
     # campaign_df['Tipo_Cliente'] = campaign_df.apply(
     #     lambda row: determine_client_type(row['Título'], row['Contacto']), axis=1
     # )
-    
-    print("Cargando plantilla...")
-    template_wb = load_workbook(template_file)
+    contacto = campaign_df['Contacto'].astype(object).where(campaign_df['Contacto'].notna(), "")
     
     print("Preparando datos para hoja Clientes...")
-    clientes_data = []
-    
-    for _, row in campaign_df.iterrows():
-        cliente_row = [
-            2,  # MODIFICADO: Es una empresa (1 Moral y 2 física) -> Todos como persona física (2)
-            row['Nombre_Mostrado'],  # Nombre mostrado /razon social
-            row['Teléfono_Clean'],  # Telefono Celular
-            "",  # email (vacío)
-            row['Contacto'] if not pd.isna(row['Contacto']) else "",  # Nombre del contacto
-            "Teléfono",  # Medio
-            "",  # Calle
-            "",  # Calle2 / referencias / Colonia
-            "",  # Casa/Num Ext
-            "",  # Puerta/Num Interior
-            "",  # C.P.
-            "",  # Ciudad
-            "",  # Estado/Nombre mostrado
-            "México",  # country_id/Pais
-            row['Vendedor_Clean'],  # Vendedor
-            1,  # Rango de cliente (valor secuencial)
-            "",  # RFC
-            ""   # Regimen fiscal
-        ]
-        clientes_data.append(cliente_row)
+    # Columnas en el orden de la hoja Clientes; los valores fijos se asignan a toda la columna
+    clientes_df = pd.DataFrame({
+        'Tipo': 2,  # MODIFICADO: Es una empresa (1 Moral y 2 física) -> Todos como persona física (2)
+        'Nombre mostrado': campaign_df['Nombre_Mostrado'],  # Nombre mostrado /razon social
+        'Telefono Celular': campaign_df['Teléfono_Clean'],  # Telefono Celular
+        'email': "",  # email (vacío)
+        'Nombre del contacto': contacto,  # Nombre del contacto
+        'Medio': "Teléfono",  # Medio
+        'Calle': "",  # Calle
+        'Calle2': "",  # Calle2 / referencias / Colonia
+        'Num Ext': "",  # Casa/Num Ext
+        'Num Interior': "",  # Puerta/Num Interior
+        'C.P.': "",  # C.P.
+        'Ciudad': "",  # Ciudad
+        'Estado': "",  # Estado/Nombre mostrado
+        'Pais': "México",  # country_id/Pais
+        'Vendedor': campaign_df['Vendedor_Clean'],  # Vendedor
+        'Rango de cliente': 1,  # Rango de cliente (valor secuencial)
+        'RFC': "",  # RFC
+        'Regimen fiscal': ""   # Regimen fiscal
+    }, index=campaign_df.index)
+    clientes_data = list(clientes_df.itertuples(index=False, name=None))
     
     print("Preparando datos para hoja Leads...")
-    leads_data = []
-    
-    for _, row in campaign_df.iterrows():
-        # MODIFICADO: Llamada a la función generate_opportunity_description actualizada
-        oportunidad_desc = generate_opportunity_description(
-            row['Contacto'], row['Etapa_Clean'], row['Vendedor_Clean']
-        )
-        # MODIFICADO: Etiquetas fijas
-        etiquetas = "MRC3D 1"
-        
-        lead_row = [
-            oportunidad_desc,  # Oportunidad Descripción (MODIFICADO: solo nombres)
-            row['Vendedor_Clean'],  # Vendedor
-            row['Contacto'] if not pd.isna(row['Contacto']) else "",  # Nombre del contacto
-            row['Etapa_Clean'],  # Etapa
-            "",  # Ingreso esperado
-            "",  # Tipo de compra
-            "",  # Producto de interés/Nombre
-            etiquetas,  # Etiquetas, seleccionar las que correspondan (MODIFICADO: "MRC3D 1")
-            "Facebook",  # Origen/Nombre de la fuente (MODIFICADO: "Facebook")
-            "",  # Recomendado por
-            "Ventas"  # Equipo de ventas/Nombre en pantalla
-        ]
-        leads_data.append(lead_row)
-    
-    print("Escribiendo datos en hoja Clientes...")
-    clientes_ws = template_wb['Clientes']
-    
-    if clientes_ws.max_row > 1: # Check if there's data beyond headers
-        clientes_ws.delete_rows(2, clientes_ws.max_row -1) # Delete existing data rows
-
-    for i, cliente in enumerate(clientes_data, start=2): # Start from row 2 (after headers)
-        for j, valor in enumerate(cliente, start=1):
-            clientes_ws.cell(row=i, column=j, value=valor)
-    
-    print("Escribiendo datos en hoja Leads...")
-    leads_ws = template_wb['Leads']
-
-    if leads_ws.max_row > 1: # Check if there's data beyond headers
-        leads_ws.delete_rows(2, leads_ws.max_row -1) # Delete existing data rows
-    
-    for i, lead in enumerate(leads_data, start=2): # Start from row 2 (after headers)
-        for j, valor in enumerate(lead, start=1):
-            leads_ws.cell(row=i, column=j, value=valor)
+    leads_df = pd.DataFrame({
+        # MODIFICADO: Oportunidad Descripción, solo nombres
+        'Oportunidad': generate_opportunity_descriptions(campaign_df['Contacto']),
+        'Vendedor': campaign_df['Vendedor_Clean'],  # Vendedor
+        'Nombre del contacto': contacto,  # Nombre del contacto
+        'Etapa': campaign_df['Etapa_Clean'],  # Etapa
+        'Ingreso esperado': "",  # Ingreso esperado
+        'Tipo de compra': "",  # Tipo de compra
+        'Producto de interés': "",  # Producto de interés/Nombre
+        'Etiquetas': "MRC3D 1",  # Etiquetas, seleccionar las que correspondan (MODIFICADO: "MRC3D 1")
+        'Origen': "Facebook",  # Origen/Nombre de la fuente (MODIFICADO: "Facebook")
+        'Recomendado por': "",  # Recomendado por
+        'Equipo de ventas': "Ventas"  # Equipo de ventas/Nombre en pantalla
+    }, index=campaign_df.index)
+    leads_data = list(leads_df.itertuples(index=False, name=None))
     
-    print(f"Guardando archivo resultado: {output_file}")
-    template_wb.save(output_file)
+    print(f"Escribiendo hojas Clientes y Leads en: {output_file}")
+    write_template_bulk(template_file, output_file, {'Clientes': clientes_data, 'Leads': leads_data})
     
     print("¡Migración completada exitosamente!")
     print(f"- {len(clientes_data)} registros añadidos a la hoja Clientes")
@@ -245,6 +443,11 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--benchmark":
+        # Uso: migrar_campana.py --benchmark [Plantilla.xlsx] [filas]
+        benchmark_writers(sys.argv[2] if len(sys.argv) > 2 else "Plantilla.xlsx",
+                          int(sys.argv[3]) if len(sys.argv) > 3 else 100000)
+        sys.exit(0)
     main()
 
 # ==================== SCRIPT SIMPLE ALTERNATIVO (NO MODIFICADO CON LOS NUEVOS REQUISITOS) ====================
@@ -1,6 +1,14 @@
 import os
 import subprocess
 import sys
+import csv
+import shutil
+import time
+import hashlib
+import sqlite3
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # --- Configuración ---
 # Puedes pre-rellenar esta variable si siempre usas la misma ruta para CoreConverter.exe
@@ -18,44 +26,493 @@ FLAC_COMPRESSION_LEVEL = "5"  # Se usa como cadena para la línea de comandos
 # EXTRA_DB_OPTIONS = ["-verify", "-delete_source"]
 EXTRA_DB_OPTIONS = ["-verify"]
 
+# Codificador a usar: "dbpoweramp" (Windows), "ffmpeg" o "flac" (codificador de referencia).
+# Los dos últimos sólo generan FLAC y funcionan también en Linux.
+ENCODER_BACKEND = "dbpoweramp"
+# Ejecutables de ffmpeg, ffprobe y flac (nombre en el PATH o ruta completa)
+FFMPEG_PATH = "ffmpeg"
+FFPROBE_PATH = "ffprobe" # Lee las etiquetas de la fuente para el codificador flac
+FLAC_PATH = "flac"
+# Opciones adicionales para cada codificador
+EXTRA_FFMPEG_OPTIONS = []
+EXTRA_FLAC_OPTIONS = ["--verify"]
+# Número de conversiones simultáneas (por defecto, una por núcleo de CPU)
+PARALLEL_JOBS = os.cpu_count() or 1
+# Tiempo máximo (segundos) por conversión antes de cancelarla
+CONVERSION_TIMEOUT = 600
+# Resumen por archivo (CSV) que se guarda en el directorio de salida
+SUMMARY_FILENAME = "resumen_conversion.csv"
+# Diario de conversiones (SQLite) en el directorio de salida. Guarda tamaño y fecha de la
+# fuente y el checksum de la salida para reanudar sin volver a convertir lo ya hecho.
+JOURNAL_FILENAME = ".conversiones.sqlite"
+# Salidas que ya existen pero no están en el diario (p. ej. de versiones anteriores del
+# script, que saltaban todo lo que ya existía): True las registra si pasan la comprobación
+# (flac -t cuando está disponible); False las vuelve a convertir y sobrescribe.
+ADOPTAR_SALIDAS_EXISTENTES = True
+# Comprobar en cada arranque que las salidas del diario siguen existiendo y su checksum
+# coincide (lee toda la librería convertida; normalmente no hace falta)
+VERIFICAR_SALIDAS = False
+
+def _ejecutar(cmd, timeout, stdin=None):
+    """Ejecuta un comando ocultando la consola en Windows y devuelve el CompletedProcess."""
+    # CREATE_NO_WINDOW oculta la ventana de la consola en Windows
+    creation_flags = 0
+    if os.name == 'nt':
+        creation_flags = subprocess.CREATE_NO_WINDOW
+
+    return subprocess.run(cmd, capture_output=True, text=True, check=False,
+                          encoding='utf-8', errors='replace', stdin=stdin,
+                          creationflags=creation_flags, timeout=timeout)
+
+class Codificador:
+    """
+    Backend de conversión. Cada subclase sabe construir su línea de comandos;
+    `convertir` devuelve (código de retorno, stdout, stderr).
+    """
+    nombre = ""
+
+    def __init__(self, ejecutable):
+        self.ejecutable = ejecutable
+
+    def comando(self, entrada, salida):
+        raise NotImplementedError
+
+    def describir(self, entrada, salida):
+        return ' '.join(self.comando(entrada, salida))
+
+    def convertir(self, entrada, salida, timeout):
+        result = _ejecutar(self.comando(entrada, salida), timeout)
+        return result.returncode, result.stdout, result.stderr
+
+class CodificadorDBpoweramp(Codificador):
+    nombre = "dBpoweramp"
+
+    def comando(self, entrada, salida):
+        cmd = [
+            self.ejecutable,
+            f"-infile={entrada}",
+            f"-outfile={salida}",
+            f"-convert_to={OUTPUT_FORMAT_NAME}"
+        ]
+        if OUTPUT_FORMAT_NAME == "FLAC":
+            cmd.append(f"-compression-level-{FLAC_COMPRESSION_LEVEL}")
+
+        cmd.extend(EXTRA_DB_OPTIONS)
+        return cmd
+
+class CodificadorFFmpeg(Codificador):
+    nombre = "ffmpeg"
+
+    def comando(self, entrada, salida):
+        # -compression_level de ffmpeg usa la misma escala 0-8 que flac/dBpoweramp
+        return [
+            self.ejecutable, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+            "-i", entrada,
+            # La portada incrustada (si la hay) se copia tal cual como imagen adjunta, igual que dBpoweramp
+            "-map", "0:a", "-map", "0:v?", "-map_metadata", "0",
+            "-c:a", "flac", "-compression_level", FLAC_COMPRESSION_LEVEL,
+            "-c:v", "copy", "-disposition:v", "attached_pic",
+            *EXTRA_FFMPEG_OPTIONS,
+            "-f", "flac", salida,
+        ]
+
+class CodificadorFlac(Codificador):
+    """
+    Codificador de referencia `flac`. Como flac no lee M4A, ffmpeg decodifica a WAV
+    por una tubería y flac comprime desde la entrada estándar. El WAV no lleva
+    etiquetas ni portada: las etiquetas se leen de la fuente con ffprobe y se pasan
+    con --tag, y la portada se extrae con ffmpeg a un temporal y se pasa con --picture.
+    """
+    nombre = "flac"
+    # Etiquetas de M4A (como las nombra ffprobe) y su comentario Vorbis equivalente
+    ETIQUETAS_VORBIS = {
+        "title": "TITLE", "artist": "ARTIST", "album": "ALBUM", "album_artist": "ALBUMARTIST",
+        "date": "DATE", "genre": "GENRE", "composer": "COMPOSER", "comment": "COMMENT",
+        "lyrics": "LYRICS", "copyright": "COPYRIGHT", "description": "DESCRIPTION",
+        "sort_name": "TITLESORT", "sort_artist": "ARTISTSORT", "sort_album": "ALBUMSORT",
+        "sort_album_artist": "ALBUMARTISTSORT", "sort_composer": "COMPOSERSORT",
+        "grouping": "GROUPING", "compilation": "COMPILATION",
+    }
+    # Etiquetas técnicas del contenedor que no son metadatos de la pista
+    ETIQUETAS_IGNORADAS = {"major_brand", "minor_version", "compatible_brands", "encoder",
+                           "creation_time", "gapless_playback", "media_type", "hd_video",
+                           "itunsmpb", "itunnorm"}
+
+    def __init__(self, ejecutable, decodificador, sondeo=None):
+        super().__init__(ejecutable)
+        self.decodificador = decodificador
+        self.sondeo = sondeo
+
+    def comando_decodificar(self, entrada):
+        return [self.decodificador, "-hide_banner", "-nostdin", "-loglevel", "error",
+                "-i", entrada, "-map", "0:a", "-f", "wav", "-"]
+
+    def comando(self, entrada, salida, etiquetas=(), portada=None):
+        return [self.ejecutable, f"-{FLAC_COMPRESSION_LEVEL}", "--silent", "-f",
+                *(f"--tag={clave}={valor}" for clave, valor in etiquetas),
+                # Tipo 3 = portada frontal; flac detecta el formato (JPEG/PNG) del archivo
+                *([f"--picture=3||||{portada}"] if portada else []),
+                *EXTRA_FLAC_OPTIONS, "-o", salida, "-"]
+
+    def extraer_portada(self, entrada, timeout):
+        """
+        Copia la portada incrustada de la fuente a un archivo temporal y devuelve su ruta,
+        o None si la fuente no tiene portada. Quien llama debe borrar el temporal.
+        """
+        descriptor, ruta = tempfile.mkstemp(suffix=".portada")
+        os.close(descriptor)
+        try:
+            result = _ejecutar([self.decodificador, "-hide_banner", "-nostdin", "-loglevel", "error", "-y",
+                                "-i", entrada, "-map", "0:v:0", "-c:v", "copy", "-frames:v", "1",
+                                "-f", "image2", ruta], timeout)
+            if result.returncode == 0 and os.path.getsize(ruta) > 0:
+                return ruta
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        os.remove(ruta)
+        return None
+
+    def leer_etiquetas(self, entrada, timeout):
+        """
+        Devuelve [(clave Vorbis, valor)] con las etiquetas de la fuente leídas con ffprobe.
+        'track' y 'disc' ("3/12") se separan en número y total. Sin ffprobe devuelve [].
+        """
+        if not self.sondeo:
+            return []
+        result = _ejecutar([self.sondeo, "-v", "error", "-show_entries", "format_tags",
+                            "-of", "json", entrada], timeout)
+        if result.returncode != 0:
+            return []
+        try:
+            etiquetas = json.loads(result.stdout or "{}").get("format", {}).get("tags", {})
+        except ValueError:
+            return []
+        pares = []
+        for clave, valor in etiquetas.items():
+            clave, valor = clave.lower(), str(valor).strip()
+            if not valor or clave in self.ETIQUETAS_IGNORADAS:
+                continue
+            if clave in ("track", "disc"):
+                numero, _, total = valor.partition("/")
+                prefijo = "TRACK" if clave == "track" else "DISC"
+                if numero.strip():
+                    pares.append((f"{prefijo}NUMBER", numero.strip()))
+                if total.strip():
+                    pares.append((f"{prefijo}TOTAL", total.strip()))
+                continue
+            # Las etiquetas sin equivalente conocido se conservan con su nombre en mayúsculas
+            # (los nombres Vorbis no pueden contener '=')
+            nombre = self.ETIQUETAS_VORBIS.get(clave, clave.upper())
+            if "=" not in nombre:
+                pares.append((nombre, valor))
+        return pares
+
+    def describir(self, entrada, salida):
+        return ' '.join(self.comando_decodificar(entrada)) + " | " + ' '.join(self.comando(entrada, salida))
+
+    def convertir(self, entrada, salida, timeout):
+        etiquetas = self.leer_etiquetas(entrada, timeout)
+        portada = self.extraer_portada(entrada, timeout)
+        creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        decodificador = subprocess.Popen(self.comando_decodificar(entrada), stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE, creationflags=creation_flags)
+        try:
+            result = _ejecutar(self.comando(entrada, salida, etiquetas, portada), timeout, stdin=decodificador.stdout)
+        finally:
+            decodificador.stdout.close()
+            if decodificador.poll() is None:
+                decodificador.kill()
+            errores_decodificador = decodificador.stderr.read().decode('utf-8', errors='replace')
+            decodificador.stderr.close()
+            decodificador.wait()
+            if portada:
+                os.remove(portada)
+        stderr = "\n".join(t for t in (errores_decodificador.strip(), result.stderr.strip()) if t)
+        codigo = result.returncode or decodificador.returncode
+        return codigo, result.stdout, stderr
+
+def crear_codificador(backend=None):
+    """Crea el codificador configurado en ENCODER_BACKEND."""
+    backend = (backend or ENCODER_BACKEND).lower()
+    if backend == "dbpoweramp":
+        return CodificadorDBpoweramp(DBPOWERAMP_CORECONVERTER_PATH)
+    if backend == "ffmpeg":
+        return CodificadorFFmpeg(shutil.which(FFMPEG_PATH) or FFMPEG_PATH)
+    if backend == "flac":
+        return CodificadorFlac(shutil.which(FLAC_PATH) or FLAC_PATH,
+                               shutil.which(FFMPEG_PATH) or FFMPEG_PATH,
+                               shutil.which(FFPROBE_PATH) or FFPROBE_PATH)
+    raise ValueError(f"Codificador desconocido: '{backend}'. Usa 'dbpoweramp', 'ffmpeg' o 'flac'.")
+
+def hash_archivo(path, block_size=1024 * 1024):
+    """SHA-256 de un archivo leído por bloques."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(block_size), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def ruta_temporal(output_full_path):
+    """Archivo temporal junto a la salida; se renombra al terminar para que nunca quede una salida a medias."""
+    directorio, nombre = os.path.split(output_full_path)
+    base, ext = os.path.splitext(nombre)
+    return os.path.join(directorio, f".{base}.convirtiendo{ext}")
+
+def limpiar_temporales(raiz):
+    """
+    Borra los temporales de conversión que quedaron de una ejecución interrumpida
+    (el proceso se cortó antes de renombrarlos). Devuelve cuántos se borraron.
+    """
+    borrados = 0
+    for carpeta, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            if nombre.startswith(".") and ".convirtiendo." in nombre:
+                try:
+                    os.remove(os.path.join(carpeta, nombre))
+                    borrados += 1
+                except OSError as e:
+                    print(f"  No se pudo borrar el temporal '{nombre}': {e}")
+    return borrados
+
+def salida_valida(path, timeout=CONVERSION_TIMEOUT):
+    """
+    Comprueba que una salida existente es un FLAC completo antes de adoptarla: cabecera
+    'fLaC' y, si el ejecutable flac está disponible, que `flac -t` la decodifique sin errores.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(4) != b"fLaC":
+                return False
+    except OSError:
+        return False
+    flac = shutil.which(FLAC_PATH)
+    if not flac:
+        return True
+    try:
+        return _ejecutar([flac, "-t", "--silent", path], timeout).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def clave_relativa(ruta, raiz):
+    """
+    Clave de una ruta en el diario: relativa a la raíz de su librería y normalizada
+    (normcase/normpath), para que mover la librería o cambiar la letra de la unidad
+    no invalide las conversiones registradas.
+    """
+    return os.path.normcase(os.path.normpath(os.path.relpath(ruta, raiz)))
+
+class DiarioConversiones:
+    """
+    Diario persistente de conversiones terminadas: ruta de la fuente, su tamaño y
+    mtime, la salida y su checksum. Una fuente cuyo tamaño o mtime no coincidan con
+    lo registrado se considera modificada y se vuelve a convertir.
+    Las rutas se guardan relativas a las raíces de entrada y salida.
+    """
+
+    def __init__(self, db_path, raiz_entrada, raiz_salida):
+        self.raiz_entrada = raiz_entrada
+        self.raiz_salida = raiz_salida
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversiones ("
+            "origen TEXT PRIMARY KEY, tamano INTEGER, mtime INTEGER, "
+            "salida TEXT, hash_salida TEXT, fecha TEXT)"
+        )
+        self.conn.commit()
+        # Se carga entero en memoria: una consulta por pista sería más lenta que el propio recorrido
+        self.registros = {
+            origen: (tamano, mtime, salida, hash_salida)
+            for origen, tamano, mtime, salida, hash_salida in
+            self.conn.execute("SELECT origen, tamano, mtime, salida, hash_salida FROM conversiones")
+        }
+
+    def estado(self, origen, tamano, mtime, salida):
+        """
+        Devuelve 'nueva', 'modificada', 'sin_salida' o 'convertida' para una fuente.
+        La entrada del diario se da por buena sin tocar la salida; sólo con
+        VERIFICAR_SALIDAS se comprueba que exista y que su checksum coincida.
+        """
+        registro = self.registros.get(clave_relativa(origen, self.raiz_entrada))
+        if registro is None:
+            return 'nueva'
+        if registro[0] != tamano or registro[1] != mtime or registro[2] != clave_relativa(salida, self.raiz_salida):
+            return 'modificada'
+        if VERIFICAR_SALIDAS:
+            if not os.path.exists(salida):
+                return 'sin_salida'
+            try:
+                if hash_archivo(salida) != registro[3]:
+                    return 'modificada'
+            except OSError:
+                return 'modificada'
+        return 'convertida'
+
+    def registrar(self, origen, tamano, mtime, salida, hash_salida):
+        clave = clave_relativa(origen, self.raiz_entrada)
+        salida = clave_relativa(salida, self.raiz_salida)
+        self.registros[clave] = (tamano, mtime, salida, hash_salida)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO conversiones (origen, tamano, mtime, salida, hash_salida, fecha) "
+            "VALUES (?, ?, ?, ?, ?, datetime('now'))",
+            (clave, tamano, mtime, salida, hash_salida),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def recorrer_m4a(raiz):
+    """
+    Recorre la librería con os.scandir y devuelve (carpeta, nombre, tamaño, mtime_ns)
+    de cada .m4a. En Windows el tamaño y la fecha vienen con el propio listado del
+    directorio, así que no hace falta un stat por archivo.
+    """
+    pendientes = [raiz]
+    while pendientes:
+        carpeta = pendientes.pop(0)
+        subcarpetas = []
+        try:
+            with os.scandir(carpeta) as it:
+                entradas = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"  No se pudo leer la carpeta '{carpeta}': {e}")
+            continue
+        for entrada in entradas:
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    subcarpetas.append(entrada.path)
+                elif entrada.name.lower().endswith(".m4a") and entrada.is_file():
+                    st = entrada.stat()
+                    yield carpeta, entrada.name, st.st_size, st.st_mtime_ns
+            except OSError:
+                continue
+        pendientes[:0] = subcarpetas
+
+def convertir_archivo(m4a_file_path, output_full_path, timeout, codificador):
+    """
+    Convierte un archivo (se ejecuta en un hilo del pool). No imprime nada: devuelve
+    el estado, la duración y las líneas de log para imprimirlas juntas al terminar.
+    Estados: 'ok', 'error', 'timeout' o 'critico' (no se encontró el codificador).
+    """
+    log = [f"Procesando: {m4a_file_path}"]
+    # Se convierte a un temporal que sólo se renombra a la salida final si todo fue bien
+    temporal = ruta_temporal(output_full_path)
+    log.append(f"  Comando: {codificador.describir(m4a_file_path, temporal)}")
+    estado = 'error'
+    codigo = None
+    hash_salida = None
+    inicio = time.perf_counter()
+
+    try:
+        # Ejecutar el comando de conversión
+        codigo, stdout, stderr = codificador.convertir(m4a_file_path, temporal, timeout)
+
+        if codigo == 0:
+            hash_salida = hash_archivo(temporal)
+            os.replace(temporal, output_full_path)
+            log.append(f"  Éxito: Convertido a -> {output_full_path}")
+            estado = 'ok'
+        else:
+            log.append(f"  Error convirtiendo {m4a_file_path}:")
+            log.append(f"    Código de retorno: {codigo}")
+            if stdout and stdout.strip():
+                log.append(f"    Salida {codificador.nombre} (stdout):\n{stdout.strip()}")
+            if stderr and stderr.strip():
+                log.append(f"    Salida {codificador.nombre} (stderr):\n{stderr.strip()}")
+    except subprocess.TimeoutExpired:
+        log.append(f"  Error: la conversión superó el tiempo límite de {timeout} s y se canceló.")
+        estado = 'timeout'
+    except FileNotFoundError:
+        log.append(f"  Error Crítico: No se pudo encontrar el codificador {codificador.nombre} en '{codificador.ejecutable}'.")
+        log.append("  Por favor, verifica la ruta e inténtalo de nuevo.")
+        estado = 'critico'
+    except Exception as e:
+        log.append(f"  Excepción durante la conversión de {m4a_file_path}: {e}")
+
+    # Un temporal que sigue ahí es una conversión fallida o cortada: no dejarlo
+    if estado != 'ok' and os.path.exists(temporal):
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+
+    segundos = time.perf_counter() - inicio
+    log.append(f"  Duración: {segundos:.1f} s")
+    return {
+        'origen': m4a_file_path,
+        'salida': output_full_path,
+        'estado': estado,
+        'codigo': codigo,
+        'segundos': round(segundos, 2),
+        'hash_salida': hash_salida,
+        'log': log,
+    }
+
 def main():
     global DBPOWERAMP_CORECONVERTER_PATH
 
-    print("Conversor de música de M4A a FLAC con dBpoweramp")
+    print(f"Conversor de música de M4A a FLAC ({ENCODER_BACKEND})")
     print("================================================")
     print(f"Este script convertirá archivos .m4a a {OUTPUT_FORMAT_NAME} manteniendo la estructura de carpetas.")
-    print("Necesitarás tener dBpoweramp Reference instalado.")
+    if ENCODER_BACKEND.lower() == "dbpoweramp":
+        print("Necesitarás tener dBpoweramp Reference instalado.")
+    else:
+        print(f"Necesitarás tener {ENCODER_BACKEND} instalado.")
     print("-" * 40)
 
-    # 1. Obtener la ruta de CoreConverter.exe
-    if not DBPOWERAMP_CORECONVERTER_PATH:
-        default_db_path = ""
-        if os.name == 'nt': # Asumir ruta común en Windows
-            program_files = os.environ.get("ProgramFiles", "C:\\Program Files")
-            program_files_x86 = os.environ.get("ProgramFiles(x86)", "C:\\Program Files (x86)")
-            possible_paths = [
-                os.path.join(program_files, "dBpoweramp", "CoreConverter.exe"),
-                os.path.join(program_files_x86, "dBpoweramp", "CoreConverter.exe")
-            ]
-            for p_path in possible_paths:
-                if os.path.exists(p_path):
-                    default_db_path = p_path
-                    break
+    # 1. Preparar el codificador
+    try:
+        codificador = crear_codificador()
+    except ValueError as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
+
+    if isinstance(codificador, CodificadorDBpoweramp):
+        # Obtener la ruta de CoreConverter.exe
+        if not DBPOWERAMP_CORECONVERTER_PATH:
+            default_db_path = ""
+            if os.name == 'nt': # Asumir ruta común en Windows
+                program_files = os.environ.get("ProgramFiles", "C:\\Program Files")
+                program_files_x86 = os.environ.get("ProgramFiles(x86)", "C:\\Program Files (x86)")
+                possible_paths = [
+                    os.path.join(program_files, "dBpoweramp", "CoreConverter.exe"),
+                    os.path.join(program_files_x86, "dBpoweramp", "CoreConverter.exe")
+                ]
+                for p_path in possible_paths:
+                    if os.path.exists(p_path):
+                        default_db_path = p_path
+                        break
         
-        if default_db_path:
-            user_path = input(f"Introduce la ruta a 'CoreConverter.exe' de dBpoweramp [{default_db_path}]: ").strip().strip('"')
-            DBPOWERAMP_CORECONVERTER_PATH = user_path if user_path else default_db_path
-        else:
-            DBPOWERAMP_CORECONVERTER_PATH = input("Introduce la ruta completa a 'CoreConverter.exe' de dBpoweramp: ").strip().strip('"')
+            if default_db_path:
+                user_path = input(f"Introduce la ruta a 'CoreConverter.exe' de dBpoweramp [{default_db_path}]: ").strip().strip('"')
+                DBPOWERAMP_CORECONVERTER_PATH = user_path if user_path else default_db_path
+            else:
+                DBPOWERAMP_CORECONVERTER_PATH = input("Introduce la ruta completa a 'CoreConverter.exe' de dBpoweramp: ").strip().strip('"')
 
 
-    if not os.path.isfile(DBPOWERAMP_CORECONVERTER_PATH) or not DBPOWERAMP_CORECONVERTER_PATH.lower().endswith("coreconverter.exe"):
-        print(f"\nError: 'CoreConverter.exe' no encontrado en la ruta especificada: '{DBPOWERAMP_CORECONVERTER_PATH}'")
-        print("Asegúrate de que dBpoweramp esté instalado y la ruta sea correcta.")
-        print(r"Ejemplo de ruta: C:\Program Files\dBpoweramp\CoreConverter.exe")
-        sys.exit(1)
+        if not os.path.isfile(DBPOWERAMP_CORECONVERTER_PATH) or not DBPOWERAMP_CORECONVERTER_PATH.lower().endswith("coreconverter.exe"):
+            print(f"\nError: 'CoreConverter.exe' no encontrado en la ruta especificada: '{DBPOWERAMP_CORECONVERTER_PATH}'")
+            print("Asegúrate de que dBpoweramp esté instalado y la ruta sea correcta.")
+            print(r"Ejemplo de ruta: C:\Program Files\dBpoweramp\CoreConverter.exe")
+            sys.exit(1)
     
-    print(f"Usando CoreConverter.exe de: {DBPOWERAMP_CORECONVERTER_PATH}")
+        print(f"Usando CoreConverter.exe de: {DBPOWERAMP_CORECONVERTER_PATH}")
+        codificador.ejecutable = DBPOWERAMP_CORECONVERTER_PATH
+    else:
+        # ffmpeg / flac deben estar instalados y accesibles (PATH o ruta completa)
+        requeridos = [codificador.ejecutable]
+        if isinstance(codificador, CodificadorFlac):
+            requeridos += [codificador.decodificador, codificador.sondeo]
+        for ejecutable in requeridos:
+            if not (os.path.isfile(ejecutable) or shutil.which(ejecutable)):
+                print(f"\nError: no se encontró el ejecutable '{ejecutable}' para el codificador {codificador.nombre}.")
+                print("Instálalo o ajusta FFMPEG_PATH / FFPROBE_PATH / FLAC_PATH en la configuración del script.")
+                sys.exit(1)
+        if OUTPUT_FORMAT_NAME != "FLAC":
+            print(f"Aviso: el codificador {codificador.nombre} sólo genera FLAC; se ignora OUTPUT_FORMAT_NAME={OUTPUT_FORMAT_NAME}.")
+        print(f"Usando el codificador {codificador.nombre}: {codificador.describir('<entrada>', '<salida>')}")
 
     # 2. Obtener el directorio de la librería de iTunes (entrada)
     input_music_library = ""
@@ -88,96 +545,113 @@ def main():
     success_count = 0
     error_count = 0
     skipped_count = 0
+    resultados = []
+
+    print(f"Conversiones en paralelo: {PARALLEL_JOBS} (tiempo límite por archivo: {CONVERSION_TIMEOUT} s)")
+
+    temporales = limpiar_temporales(output_converted_library)
+    if temporales:
+        print(f"Borrados {temporales} temporales de una ejecución interrumpida.")
+    diario = DiarioConversiones(os.path.join(output_converted_library, JOURNAL_FILENAME),
+                                input_music_library, output_converted_library)
+    print(f"Diario de conversiones: {len(diario.registros)} pistas registradas.")
+    carpetas_creadas = set()
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_JOBS) as executor:
+        futuros = {}
+        for root_dir, filename, tamano, mtime in recorrer_m4a(input_music_library):
+            m4a_file_path = os.path.join(root_dir, filename)
+            processed_count += 1
+
+            # Calcular la ruta relativa para mantener la estructura de carpetas
+            relative_dir_path = os.path.relpath(root_dir, input_music_library)
+
+            # Construir la ruta de salida completa
+            output_file_basename = os.path.splitext(filename)[0] + OUTPUT_EXTENSION
+
+            if relative_dir_path == ".": # Archivos en la raíz del directorio de entrada
+                output_target_dir = output_converted_library
+            else:
+                output_target_dir = os.path.join(output_converted_library, relative_dir_path)
+
+            output_full_path = os.path.join(output_target_dir, output_file_basename)
 
-    for root_dir, _, files in os.walk(input_music_library):
-        for filename in files:
-            if filename.lower().endswith(".m4a"):
-                m4a_file_path = os.path.join(root_dir, filename)
-                processed_count += 1
-                
-                print(f"\n[{processed_count}] Procesando: {m4a_file_path}")
-
-                # Calcular la ruta relativa para mantener la estructura de carpetas
-                relative_dir_path = os.path.relpath(root_dir, input_music_library)
-                
-                # Construir la ruta de salida completa
-                output_file_basename = os.path.splitext(filename)[0] + OUTPUT_EXTENSION
-                
-                if relative_dir_path == ".": # Archivos en la raíz del directorio de entrada
-                    output_target_dir = output_converted_library
-                else:
-                    output_target_dir = os.path.join(output_converted_library, relative_dir_path)
-
-                output_full_path = os.path.join(output_target_dir, output_file_basename)
-
-                # Crear el subdirectorio de salida si no existe
+            # Consultar el diario: lo ya convertido no se vuelve a tocar (ni siquiera la salida)
+            estado_diario = diario.estado(m4a_file_path, tamano, mtime, output_full_path)
+            if estado_diario == 'convertida':
+                skipped_count += 1
+                continue
+            if estado_diario == 'nueva' and ADOPTAR_SALIDAS_EXISTENTES and os.path.exists(output_full_path):
+                # Salida de una ejecución anterior al diario: se registra sólo si está completa
+                if salida_valida(output_full_path):
+                    print(f"\n[{processed_count}] Saltando, el archivo de salida ya existe: {output_full_path}")
+                    try:
+                        diario.registrar(m4a_file_path, tamano, mtime, output_full_path, hash_archivo(output_full_path))
+                    except OSError as e:
+                        print(f"  No se pudo registrar en el diario: {e}")
+                    skipped_count += 1
+                    continue
+                print(f"\n[{processed_count}] La salida existente no es válida, se convertirá de nuevo: {output_full_path}")
+            if estado_diario == 'modificada':
+                print(f"\n[{processed_count}] La fuente cambió desde la última conversión, se convertirá de nuevo: {m4a_file_path}")
+            elif estado_diario == 'sin_salida':
+                print(f"\n[{processed_count}] La salida registrada ya no existe, se convertirá de nuevo: {output_full_path}")
+
+            # Crear el subdirectorio de salida si no existe
+            if output_target_dir not in carpetas_creadas:
                 try:
                     os.makedirs(output_target_dir, exist_ok=True)
+                    carpetas_creadas.add(output_target_dir)
                 except OSError as e:
+                    print(f"\n[{processed_count}] {m4a_file_path}")
                     print(f"  Error creando el subdirectorio de salida '{output_target_dir}': {e}")
                     error_count += 1
                     continue # Saltar este archivo
 
-                # Verificar si el archivo de salida ya existe
-                if os.path.exists(output_full_path):
-                    print(f"  Saltando, el archivo de salida ya existe: {output_full_path}")
-                    skipped_count +=1
-                    continue
+            futuro = executor.submit(convertir_archivo, m4a_file_path, output_full_path, CONVERSION_TIMEOUT, codificador)
+            futuros[futuro] = (processed_count, tamano, mtime)
 
-                # Construir el comando para dbpoweramp
-                cmd = [
-                    DBPOWERAMP_CORECONVERTER_PATH,
-                    f"-infile={m4a_file_path}",
-                    f"-outfile={output_full_path}",
-                    f"-convert_to={OUTPUT_FORMAT_NAME}"
-                ]
-                if OUTPUT_FORMAT_NAME == "FLAC":
-                    cmd.append(f"-compression-level-{FLAC_COMPRESSION_LEVEL}")
-                
-                cmd.extend(EXTRA_DB_OPTIONS)
+        print(f"\nEn cola: {len(futuros)} conversiones.")
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            # Cada pista se imprime como un bloque para que no se mezclen las salidas
+            numero, tamano, mtime = futuros[futuro]
+            print(f"\n[{numero}] " + "\n".join(resultado['log']))
+            if resultado['estado'] == 'ok':
+                diario.registrar(resultado['origen'], tamano, mtime, resultado['salida'], resultado['hash_salida'])
+                success_count += 1
+            elif resultado['estado'] == 'critico':
+                # Esto no debería ocurrir si ya verificamos la ruta del codificador
+                executor.shutdown(wait=True, cancel_futures=True)
+                diario.close()
+                sys.exit(1)
+            else:
+                error_count += 1
 
-                print(f"  Comando: {' '.join(cmd)}")
+    diario.close()
 
-                try:
-                    # Ejecutar el comando de conversión
-                    # CREATE_NO_WINDOW oculta la ventana de la consola en Windows
-                    creation_flags = 0
-                    if os.name == 'nt':
-                        creation_flags = subprocess.CREATE_NO_WINDOW
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True, check=False, 
-                                            encoding='utf-8', errors='replace',
-                                            creationflags=creation_flags)
-                    
-                    if result.returncode == 0:
-                        print(f"  Éxito: Convertido a -> {output_full_path}")
-                        if result.stdout and result.stdout.strip():
-                            # dBpoweramp a veces no produce salida en stdout en éxito si no hay problemas
-                            pass # print(f"    Salida dBpoweramp (stdout):\n{result.stdout.strip()}")
-                        success_count += 1
-                    else:
-                        print(f"  Error convirtiendo {m4a_file_path}:")
-                        print(f"    Código de retorno: {result.returncode}")
-                        if result.stdout and result.stdout.strip():
-                            print(f"    Salida dBpoweramp (stdout):\n{result.stdout.strip()}")
-                        if result.stderr and result.stderr.strip():
-                            print(f"    Salida dBpoweramp (stderr):\n{result.stderr.strip()}")
-                        error_count += 1
-                except FileNotFoundError:
-                    # Esto no debería ocurrir si ya verificamos DBPOWERAMP_CORECONVERTER_PATH
-                    print(f"  Error Crítico: No se pudo encontrar CoreConverter.exe en '{DBPOWERAMP_CORECONVERTER_PATH}'.")
-                    print("  Por favor, verifica la ruta e inténtalo de nuevo.")
-                    sys.exit(1) 
-                except Exception as e:
-                    print(f"  Excepción durante la conversión de {m4a_file_path}: {e}")
-                    error_count += 1
+    # Se escribe siempre (solo encabezados si no se convirtió nada) para no dejar el de otra ejecución
+    resumen_path = os.path.join(output_converted_library, SUMMARY_FILENAME)
+    try:
+        with open(resumen_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=['origen', 'salida', 'estado', 'codigo', 'segundos'])
+            writer.writeheader()
+            for r in sorted(resultados, key=lambda r: r['origen']):
+                writer.writerow({k: r[k] for k in writer.fieldnames})
+        print(f"\nResumen por archivo guardado en: {resumen_path}")
+    except OSError as e:
+        print(f"\nNo se pudo guardar el resumen por archivo: {e}")
 
     print("\n" + "-" * 40)
     print("--- Resumen de Conversión ---")
     print(f"Archivos .m4a encontrados: {processed_count}")
     print(f"Conversiones exitosas: {success_count}")
-    print(f"Archivos omitidos (ya existían): {skipped_count}")
+    print(f"Archivos omitidos (ya convertidos): {skipped_count}")
     print(f"Conversiones fallidas: {error_count}")
+    if resultados:
+        tiempo_total = sum(r['segundos'] for r in resultados)
+        print(f"Tiempo de conversión acumulado: {tiempo_total:.1f} s")
     print(f"Archivos convertidos guardados en: {output_converted_library}")
     print("-" * 40)
 
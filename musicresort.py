@@ -1,14 +1,45 @@
 import os
 import shutil
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import sys
 import re # Para sanitizar nombres de archivo
+import csv
+import json
+import argparse
+import struct
+import sqlite3
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 try:
-    import mutagen
-    from mutagen.flac import FLACNoHeaderError
-    MUTAGEN_AVAILABLE = True
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    TK_AVAILABLE = True
 except ImportError:
-    MUTAGEN_AVAILABLE = False
+    # Máquinas sin interfaz gráfica: sólo se puede usar la línea de comandos
+    TK_AVAILABLE = False
+
+# --- Configuración ---
+# Hilos para leer etiquetas en paralelo (la latencia de USB/HDD domina, no la CPU)
+HILOS_LECTURA = 8
+# Caché de prefijos ya leídos, por ruta + tamaño + fecha de modificación
+CACHE_ETIQUETAS = os.path.join(os.path.expanduser("~"), ".musicresort_etiquetas.sqlite")
+
+# Copias entre dispositivos distintos (p. ej. disco -> USB): archivos copiándose a la vez
+# y tamaño del búfer de lectura/escritura
+ARCHIVOS_EN_VUELO = 3
+BUFFER_COPIA = 8 * 1024 * 1024
+# Verificar cada copia releyendo el destino y comparando su SHA-256 con el del origen
+# antes de borrar el origen (False: sólo se compara el tamaño)
+VERIFICAR_COPIA_HASH = True
+# Segundos mínimos entre dos líneas de progreso de la copia
+INTERVALO_PROGRESO = 1.0
+
+# Columnas del plan de movimiento (--simular / --ejecutar-plan)
+CAMPOS_PLAN = ['numero', 'prefijo', 'accion', 'origen', 'nombre_nuevo', 'destino']
+
+# Tipo de bloque de metadatos FLAC que contiene las etiquetas
+FLAC_BLOQUE_VORBIS_COMMENT = 4
 
 def seleccionar_carpeta(titulo_ventana):
     """Abre un diálogo para seleccionar una carpeta."""
@@ -33,25 +64,69 @@ def sanitize_filename_part(text_original):
     text = text.strip('_')
     return text[:40]
 
+def leer_comentarios_vorbis(ruta_archivo):
+    """
+    Lee sólo el bloque VORBIS_COMMENT de un FLAC saltando (seek) el resto de bloques
+    de metadatos, sin leer el audio. Devuelve {clave_en_minúsculas: [valores]}.
+    Lanza ValueError si el archivo no tiene cabecera FLAC.
+    """
+    with open(ruta_archivo, 'rb') as f:
+        inicio = 0
+        cabecera = f.read(10)
+        if cabecera[:3] == b'ID3':
+            # Etiqueta ID3v2 delante del stream: tamaño "synchsafe" de 4 x 7 bits
+            tamano_id3 = 0
+            for byte in cabecera[6:10]:
+                tamano_id3 = (tamano_id3 << 7) | (byte & 0x7F)
+            inicio = 10 + tamano_id3
+        f.seek(inicio)
+        if f.read(4) != b'fLaC':
+            raise ValueError("No es un archivo FLAC")
+
+        while True:
+            bloque = f.read(4)
+            if len(bloque) < 4:
+                return {}
+            ultimo = bloque[0] & 0x80
+            tipo = bloque[0] & 0x7F
+            longitud = int.from_bytes(bloque[1:4], 'big')
+            if tipo == FLAC_BLOQUE_VORBIS_COMMENT:
+                return _parsear_vorbis_comment(f.read(longitud))
+            if ultimo:
+                return {}
+            f.seek(longitud, 1)
+
+def _parsear_vorbis_comment(datos):
+    """Decodifica un bloque VORBIS_COMMENT (enteros little-endian, campos CLAVE=valor en UTF-8)."""
+    comentarios = {}
+    (longitud_vendor,) = struct.unpack_from('<I', datos, 0)
+    pos = 4 + longitud_vendor
+    (cantidad,) = struct.unpack_from('<I', datos, pos)
+    pos += 4
+    for _ in range(cantidad):
+        (longitud,) = struct.unpack_from('<I', datos, pos)
+        pos += 4
+        campo = datos[pos:pos + longitud].decode('utf-8', errors='replace')
+        pos += longitud
+        clave, separador, valor = campo.partition('=')
+        if separador:
+            comentarios.setdefault(clave.lower(), []).append(valor)
+    return comentarios
+
 def obtener_prefijo_flac(ruta_archivo):
     """
     Intenta extraer Artista del Álbum, Artista o Álbum de un archivo FLAC.
     Devuelve un prefijo sanitizado o un genérico si no se encuentra/error.
     """
-    if not MUTAGEN_AVAILABLE:
-        return "FLAC_AUDIO"
-
     try:
-        audio = mutagen.File(ruta_archivo, easy=True)
-        if not audio:
-            return "FLAC_AUDIO"
+        audio = leer_comentarios_vorbis(ruta_archivo)
 
         prefijo_extraido = None
-        if 'albumartist' in audio and audio['albumartist'][0]:
+        if audio.get('albumartist') and audio['albumartist'][0]:
             prefijo_extraido = audio['albumartist'][0]
-        elif 'artist' in audio and audio['artist'][0]:
+        elif audio.get('artist') and audio['artist'][0]:
             prefijo_extraido = audio['artist'][0]
-        elif 'album' in audio and audio['album'][0]:
+        elif audio.get('album') and audio['album'][0]:
             prefijo_extraido = audio['album'][0]
         
         if prefijo_extraido:
@@ -60,29 +135,342 @@ def obtener_prefijo_flac(ruta_archivo):
         else:
             return "FLAC_AUDIO"
 
-    except FLACNoHeaderError:
+    except ValueError:
         return "FLAC_CORRUPTO"
     except Exception:
         return "FLAC_AUDIO"
 
+class CacheEtiquetas:
+    """Caché persistente de prefijos FLAC. Una entrada sólo vale si tamaño y mtime coinciden."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS prefijos ("
+            "ruta TEXT PRIMARY KEY, tamano INTEGER, mtime INTEGER, prefijo TEXT)"
+        )
+
+    def obtener(self, ruta, tamano, mtime):
+        fila = self.conn.execute(
+            "SELECT prefijo FROM prefijos WHERE ruta = ? AND tamano = ? AND mtime = ?",
+            (ruta, tamano, mtime),
+        ).fetchone()
+        return fila[0] if fila else None
+
+    def purgar_inexistentes(self):
+        """Borra las entradas de archivos que ya no existen (movidos o eliminados). Devuelve cuántas."""
+        inexistentes = [(ruta,) for (ruta,) in self.conn.execute("SELECT ruta FROM prefijos")
+                        if not os.path.exists(ruta)]
+        if inexistentes:
+            self.conn.executemany("DELETE FROM prefijos WHERE ruta = ?", inexistentes)
+            self.conn.commit()
+        return len(inexistentes)
+
+    def guardar_varios(self, filas):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO prefijos (ruta, tamano, mtime, prefijo) VALUES (?, ?, ?, ?)",
+            filas,
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def prefijo_por_extension(extension):
+    """Prefijo para archivos que no son FLAC: la extensión en mayúsculas."""
+    ext_limpia = extension[1:] if extension and len(extension) > 1 else ""
+    prefijo_descriptivo = sanitize_filename_part(ext_limpia.upper())
+    return prefijo_descriptivo or "ARCHIVO"
+
+def escanear_prefijos(rutas, hilos=HILOS_LECTURA, cache_path=CACHE_ETIQUETAS):
+    """
+    Fase de escaneo: calcula el prefijo descriptivo de cada archivo antes de mover nada.
+    Las etiquetas FLAC se leen en un pool de hilos y se guardan en caché por ruta + mtime.
+    Devuelve una lista de prefijos en el mismo orden que `rutas`.
+    """
+    prefijos = [None] * len(rutas)
+    pendientes = []  # (índice, ruta, tamaño, mtime)
+
+    try:
+        cache = CacheEtiquetas(cache_path)
+    except sqlite3.Error as e:
+        print(f"No se pudo abrir la caché de etiquetas ({e}); se leerán todas.")
+        cache = None
+
+    for i, ruta in enumerate(rutas):
+        extension = os.path.splitext(ruta)[1]
+        if extension.lower() != '.flac':
+            prefijos[i] = prefijo_por_extension(extension)
+            continue
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            prefijos[i] = "FLAC_AUDIO"
+            continue
+        en_cache = cache.obtener(ruta, st.st_size, st.st_mtime_ns) if cache else None
+        if en_cache is not None:
+            prefijos[i] = en_cache
+        else:
+            pendientes.append((i, ruta, st.st_size, st.st_mtime_ns))
+
+    if pendientes:
+        print(f"Leyendo etiquetas de {len(pendientes)} archivos FLAC ({len(rutas) - len(pendientes)} resueltos sin leer)...")
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            leidos = executor.map(obtener_prefijo_flac, [ruta for _, ruta, _, _ in pendientes])
+            filas = []
+            for (i, ruta, tamano, mtime), prefijo in zip(pendientes, leidos):
+                prefijos[i] = prefijo
+                filas.append((ruta, tamano, mtime, prefijo))
+        if cache:
+            cache.guardar_varios(filas)
+
+    if cache:
+        # Las rutas antiguas de archivos ya renombrados nunca volverán a consultarse
+        cache.purgar_inexistentes()
+        cache.close()
+    return prefijos
+
+def hash_archivo(ruta, block_size=BUFFER_COPIA):
+    """SHA-256 de un archivo leído por bloques."""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(block_size), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+class ProgresoBytes:
+    """Contador de bytes copiados compartido por los hilos de copia."""
+
+    def __init__(self, total):
+        self.total = total
+        self.copiados = 0
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def sumar(self, n):
+        with self._lock:
+            self.copiados += n
+
+    def linea(self):
+        segundos = max(time.perf_counter() - self.inicio, 1e-6)
+        mb = self.copiados / (1024 * 1024)
+        total_mb = self.total / (1024 * 1024)
+        porcentaje = 100.0 * self.copiados / self.total if self.total else 100.0
+        return f"  Copiado: {mb:,.1f} / {total_mb:,.1f} MB ({porcentaje:.1f}%) a {mb / segundos:,.1f} MB/s"
+
+def copiar_verificado(origen, destino, progreso):
+    """
+    Copia `origen` a un temporal junto a `destino` con un búfer grande, calculando el
+    SHA-256 mientras lee. Tras sincronizar y verificar la copia la renombra a `destino`
+    y sólo entonces borra el origen. Si algo falla, el origen queda intacto.
+    """
+    temporal = destino + ".parcial"
+    h = hashlib.sha256()
+    buffer = bytearray(BUFFER_COPIA)
+    vista = memoryview(buffer)
+    try:
+        with open(origen, 'rb') as f_origen, open(temporal, 'wb') as f_destino:
+            while True:
+                n = f_origen.readinto(buffer)
+                if not n:
+                    break
+                f_destino.write(vista[:n])
+                h.update(vista[:n])
+                progreso.sumar(n)
+            f_destino.flush()
+            os.fsync(f_destino.fileno())
+        shutil.copystat(origen, temporal)
+
+        if os.path.getsize(temporal) != os.path.getsize(origen):
+            raise OSError("la copia no tiene el mismo tamaño que el original")
+        if VERIFICAR_COPIA_HASH and hash_archivo(temporal) != h.hexdigest():
+            raise OSError("la copia no coincide con el original (SHA-256)")
+        os.replace(temporal, destino)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    os.remove(origen)
+
+def mover_plan(plan, reportar):
+    """
+    Mueve los archivos del plan: lista de (origen, destino).
+    Los que están en el mismo dispositivo que el destino se mueven con os.replace (sin copiar datos);
+    el resto se copian en paralelo (ARCHIVOS_EN_VUELO) con verificación antes de borrar el origen.
+    `reportar(indice, error)` se llama desde este hilo al terminar cada archivo (error es None si fue bien).
+    """
+    if not plan:
+        return
+    dispositivo_destino = os.stat(os.path.dirname(os.path.abspath(plan[0][1]))).st_dev
+
+    renombrar = []
+    copiar = []
+    for indice, (origen, destino) in enumerate(plan):
+        try:
+            st = os.stat(origen)
+        except OSError as e:
+            reportar(indice, e)
+            continue
+        if st.st_dev == dispositivo_destino:
+            renombrar.append(indice)
+        else:
+            copiar.append((indice, st.st_size))
+
+    if renombrar:
+        print(f"Renombrando {len(renombrar)} archivos en el mismo dispositivo...")
+    for indice in renombrar:
+        origen, destino = plan[indice]
+        try:
+            os.replace(origen, destino)
+            reportar(indice, None)
+        except OSError as e:
+            reportar(indice, e)
+
+    if not copiar:
+        return
+    progreso = ProgresoBytes(sum(tamano for _, tamano in copiar))
+    print(f"Copiando {len(copiar)} archivos a otro dispositivo ({progreso.total / (1024 * 1024):,.1f} MB)...")
+    with ThreadPoolExecutor(max_workers=ARCHIVOS_EN_VUELO) as executor:
+        futuros = {
+            executor.submit(copiar_verificado, plan[indice][0], plan[indice][1], progreso): indice
+            for indice, _ in copiar
+        }
+        pendientes = set(futuros)
+        ultimo_informe = time.monotonic()
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=INTERVALO_PROGRESO, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                reportar(futuros[futuro], futuro.exception())
+            # wait vuelve con cada archivo terminado; el progreso se imprime como mucho una vez por intervalo
+            ahora = time.monotonic()
+            if ahora - ultimo_informe >= INTERVALO_PROGRESO or not pendientes:
+                print(progreso.linea())
+                ultimo_informe = ahora
+
+def listar_archivos(carpeta_origen):
+    """Todos los archivos de la carpeta de origen (recursivo), en el orden de os.walk."""
+    lista_rutas_archivos_origen = []
+    for dirpath, _, filenames in os.walk(carpeta_origen):
+        for filename in filenames:
+            lista_rutas_archivos_origen.append(os.path.join(dirpath, filename))
+    return lista_rutas_archivos_origen
+
+def planificar(carpeta_origen, usb_raiz_destino, lista_rutas_archivos_origen=None):
+    """
+    Calcula el plan completo de renombrado sin tocar ningún archivo: número, prefijo,
+    nombre nuevo y ruta de destino de cada archivo. `accion` es 'mover' u 'omitir'.
+    """
+    if lista_rutas_archivos_origen is None:
+        lista_rutas_archivos_origen = listar_archivos(carpeta_origen)
+
+    # Fase de escaneo: todas las etiquetas se leen antes de empezar a mover
+    prefijos = escanear_prefijos(lista_rutas_archivos_origen)
+
+    num_digitos = len(str(len(lista_rutas_archivos_origen)))
+    plan = []
+    for i, (ruta_origen_completa, prefijo_descriptivo) in enumerate(zip(lista_rutas_archivos_origen, prefijos)):
+        nombre_archivo_original = os.path.basename(ruta_origen_completa)
+        nombre_base, extension = os.path.splitext(nombre_archivo_original)
+        
+        if not prefijo_descriptivo:
+            prefijo_descriptivo = "GENERAL"
+
+        numero_formateado = f"{i + 1:0{num_digitos}d}"
+        
+        nuevo_nombre_archivo = f"{numero_formateado}-{prefijo_descriptivo}-{nombre_base.lstrip('-_')}{extension}"
+        ruta_destino_completa = os.path.join(usb_raiz_destino, nuevo_nombre_archivo)
+
+        # Evitar mover un archivo sobre sí mismo si origen y destino son iguales (poco probable aquí)
+        mismo = os.path.abspath(ruta_origen_completa) == os.path.abspath(ruta_destino_completa)
+        plan.append({
+            'numero': numero_formateado,
+            'prefijo': prefijo_descriptivo,
+            'accion': 'omitir' if mismo else 'mover',
+            'origen': ruta_origen_completa,
+            'nombre_nuevo': nuevo_nombre_archivo,
+            'destino': ruta_destino_completa,
+        })
+    return plan
+
+def guardar_plan(plan, ruta_plan):
+    """Escribe el plan en CSV o JSON según la extensión."""
+    if ruta_plan.lower().endswith(".json"):
+        with open(ruta_plan, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+    else:
+        with open(ruta_plan, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CAMPOS_PLAN)
+            writer.writeheader()
+            writer.writerows(plan)
+
+def cargar_plan(ruta_plan):
+    """Lee un plan guardado con guardar_plan."""
+    if ruta_plan.lower().endswith(".json"):
+        with open(ruta_plan, encoding="utf-8") as f:
+            return json.load(f)
+    with open(ruta_plan, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def ejecutar_plan(plan, carpeta_origen, usb_raiz_destino):
+    """
+    Mueve los archivos según el plan y guarda el log detallado en la raíz del destino.
+    Devuelve (archivos movidos, lista de fallidos).
+    """
+    archivos_movidos_contador = 0
+    archivos_fallidos = []
+    log_operaciones = [f"Origen: {carpeta_origen}", f"Destino: {usb_raiz_destino}", "---"]
+
+    print(f"Moviendo archivos de '{carpeta_origen}' (y subcarpetas) a '{usb_raiz_destino}'...")
+    print("--------------------------------------------------")
+
+    movimientos = []
+    for entrada in plan:
+        if entrada['accion'] == 'omitir':
+            msg = f"OMITIDO (mismo origen y destino): '{os.path.basename(entrada['origen'])}'"
+            log_operaciones.append(msg)
+            print(msg)
+        else:
+            movimientos.append((entrada['origen'], entrada['destino']))
+
+    def reportar(indice, error):
+        nonlocal archivos_movidos_contador
+        ruta_origen_completa, ruta_destino_completa = movimientos[indice]
+        nombre_archivo_original = os.path.basename(ruta_origen_completa)
+        if error is None:
+            msg = f"OK: '{nombre_archivo_original}' (de '{os.path.dirname(ruta_origen_completa)}') -> '{os.path.basename(ruta_destino_completa)}'"
+            log_operaciones.append(msg)
+            print(msg)
+            archivos_movidos_contador += 1
+        else:
+            error_msg = f"ERROR al mover '{nombre_archivo_original}': {error}"
+            log_operaciones.append(error_msg)
+            print(error_msg)
+            archivos_fallidos.append(f"{nombre_archivo_original} (Error: {error})")
+
+    mover_plan(movimientos, reportar)
+    print("--------------------------------------------------")
+
+    # Guardar log detallado en la raíz de la USB
+    try:
+        numero_formateado = plan[-1]['numero'] if plan else "0"
+        log_filename = f"log_movimiento_{os.path.basename(carpeta_origen)}_{numero_formateado}.txt"
+        with open(os.path.join(usb_raiz_destino, log_filename), "w", encoding="utf-8") as logfile:
+            logfile.write("Resumen de operaciones:\n")
+            for linea in log_operaciones:
+                logfile.write(linea + "\n")
+        print(f"Log detallado guardado en: {os.path.join(usb_raiz_destino, log_filename)}")
+    except Exception as e:
+        print(f"No se pudo guardar el log detallado: {e}")
+
+    return archivos_movidos_contador, archivos_fallidos
+
 def organizar_y_mover_archivos():
     """
     Función principal para seleccionar carpetas, renombrar automáticamente
     y mover archivos (buscando recursivamente) a la raíz de una USB.
     """
-    if not MUTAGEN_AVAILABLE:
-        # Crear una ventana raíz temporal para el messagebox si no existe
-        temp_root_for_msg = None
-        if not tk._default_root:
-            temp_root_for_msg = tk.Tk()
-            temp_root_for_msg.withdraw()
-        messagebox.showerror("Dependencia Faltante",
-                             "La biblioteca 'mutagen' es necesaria para leer metadatos de FLAC.\n"
-                             "Por favor, instálala con: pip install mutagen")
-        if temp_root_for_msg:
-            temp_root_for_msg.destroy()
-        return
-
     root = tk.Tk()
     root.withdraw() # Escondemos la ventana principal de Tkinter
 
@@ -102,10 +490,7 @@ def organizar_y_mover_archivos():
 
     try:
         print("Escaneando archivos en la carpeta de origen (esto puede tardar un momento)...")
-        lista_rutas_archivos_origen = []
-        for dirpath, _, filenames in os.walk(carpeta_origen):
-            for filename in filenames:
-                lista_rutas_archivos_origen.append(os.path.join(dirpath, filename))
+        lista_rutas_archivos_origen = listar_archivos(carpeta_origen)
         
         if not lista_rutas_archivos_origen:
             messagebox.showinfo("Información", "No se encontraron archivos (ni en subcarpetas) en la carpeta de origen.", parent=root)
@@ -114,56 +499,8 @@ def organizar_y_mover_archivos():
         
         print(f"Se encontraron {len(lista_rutas_archivos_origen)} archivos para procesar.")
 
-        num_digitos = len(str(len(lista_rutas_archivos_origen)))
-        archivos_movidos_contador = 0
-        archivos_fallidos = []
-        log_operaciones = [f"Origen: {carpeta_origen}", f"Destino: {usb_raiz_destino}", "---"]
-
-
-        print(f"Moviendo archivos de '{carpeta_origen}' (y subcarpetas) a '{usb_raiz_destino}'...")
-        print("--------------------------------------------------")
-
-        for i, ruta_origen_completa in enumerate(lista_rutas_archivos_origen):
-            nombre_archivo_original = os.path.basename(ruta_origen_completa)
-            nombre_base, extension = os.path.splitext(nombre_archivo_original)
-            
-            prefijo_descriptivo = ""
-            if extension.lower() == '.flac':
-                prefijo_descriptivo = obtener_prefijo_flac(ruta_origen_completa)
-            else:
-                ext_limpia = extension[1:] if extension and len(extension) > 1 else ""
-                prefijo_descriptivo = sanitize_filename_part(ext_limpia.upper())
-                if not prefijo_descriptivo:
-                    prefijo_descriptivo = "ARCHIVO"
-            
-            if not prefijo_descriptivo:
-                prefijo_descriptivo = "GENERAL"
-
-            numero_formateado = f"{i + 1:0{num_digitos}d}"
-            
-            nuevo_nombre_archivo = f"{numero_formateado}-{prefijo_descriptivo}-{nombre_base.lstrip('-_')}{extension}"
-            ruta_destino_completa = os.path.join(usb_raiz_destino, nuevo_nombre_archivo)
-
-            # Evitar mover un archivo sobre sí mismo si origen y destino son iguales (poco probable aquí)
-            if os.path.abspath(ruta_origen_completa) == os.path.abspath(ruta_destino_completa):
-                msg = f"OMITIDO (mismo origen y destino): '{nombre_archivo_original}'"
-                log_operaciones.append(msg)
-                print(msg)
-                continue
-
-            try:
-                shutil.move(ruta_origen_completa, ruta_destino_completa)
-                msg = f"OK: '{nombre_archivo_original}' (de '{os.path.dirname(ruta_origen_completa)}') -> '{nuevo_nombre_archivo}'"
-                log_operaciones.append(msg)
-                print(msg)
-                archivos_movidos_contador += 1
-            except Exception as e:
-                error_msg = f"ERROR al mover '{nombre_archivo_original}': {e}"
-                log_operaciones.append(error_msg)
-                print(error_msg)
-                archivos_fallidos.append(f"{nombre_archivo_original} (Error: {e})")
-        
-        print("--------------------------------------------------")
+        plan = planificar(carpeta_origen, usb_raiz_destino, lista_rutas_archivos_origen)
+        archivos_movidos_contador, archivos_fallidos = ejecutar_plan(plan, carpeta_origen, usb_raiz_destino)
         
         resumen_final = f"Proceso completado.\n\nArchivos encontrados: {len(lista_rutas_archivos_origen)}\nArchivos movidos exitosamente: {archivos_movidos_contador}"
         if archivos_fallidos:
@@ -171,17 +508,6 @@ def organizar_y_mover_archivos():
             messagebox.showwarning("Proceso Completado con Errores", resumen_final, parent=root)
         else:
             messagebox.showinfo("Proceso Completado", resumen_final, parent=root)
-        
-        # Guardar log detallado en la raíz de la USB
-        try:
-            log_filename = f"log_movimiento_{os.path.basename(carpeta_origen)}_{numero_formateado}.txt"
-            with open(os.path.join(usb_raiz_destino, log_filename), "w", encoding="utf-8") as logfile:
-                logfile.write("Resumen de operaciones:\n")
-                for linea in log_operaciones:
-                    logfile.write(linea + "\n")
-            print(f"Log detallado guardado en: {os.path.join(usb_raiz_destino, log_filename)}")
-        except Exception as e:
-            print(f"No se pudo guardar el log detallado: {e}")
 
 
     except FileNotFoundError: # Esto es menos probable ahora con las comprobaciones iniciales
@@ -192,5 +518,63 @@ def organizar_y_mover_archivos():
         if root: # Asegurarse de que la ventana de Tkinter se cierre
             root.destroy()
 
+def main(argv):
+    """
+    Uso sin interfaz gráfica. Devuelve 0 si todo salió bien y 1 si hubo fallos.
+      musicresort.py ORIGEN DESTINO                     planifica y mueve
+      musicresort.py ORIGEN DESTINO --simular [--plan p.csv]  sólo guarda el plan
+      musicresort.py --ejecutar-plan p.csv              mueve según un plan guardado
+    """
+    parser = argparse.ArgumentParser(prog="musicresort", description="Renombra y mueve archivos a la raíz de una USB sin interfaz gráfica.")
+    parser.add_argument("origen", nargs="?", help="Carpeta de origen (se busca en subcarpetas)")
+    parser.add_argument("destino", nargs="?", help="Raíz de la unidad de destino")
+    parser.add_argument("--simular", action="store_true", help="Calcular el plan y guardarlo sin mover nada")
+    parser.add_argument("--plan", default="plan_movimiento.csv", help="Ruta del plan (.csv o .json)")
+    parser.add_argument("--ejecutar-plan", metavar="PLAN", help="Mover según un plan guardado con --simular")
+    args = parser.parse_args(argv)
+
+    if args.ejecutar_plan:
+        plan = cargar_plan(args.ejecutar_plan)
+        if not plan:
+            print("El plan está vacío.")
+            return 1
+        origenes = [e['origen'] for e in plan]
+        carpeta_origen = os.path.commonpath(origenes) if len(origenes) > 1 else os.path.dirname(origenes[0])
+        usb_raiz_destino = os.path.dirname(plan[0]['destino'])
+        print(f"Plan cargado de '{args.ejecutar_plan}': {len(plan)} archivos.")
+    else:
+        if not args.origen or not args.destino:
+            parser.error("indica ORIGEN y DESTINO, o --ejecutar-plan")
+        if not os.path.isdir(args.origen) or not os.path.isdir(args.destino):
+            print("La carpeta de origen o destino no existe o no es accesible.")
+            return 1
+        # Rutas absolutas para que el plan se pueda ejecutar desde otra carpeta
+        carpeta_origen, usb_raiz_destino = os.path.abspath(args.origen), os.path.abspath(args.destino)
+
+        t0 = time.perf_counter()
+        lista_rutas_archivos_origen = listar_archivos(carpeta_origen)
+        if not lista_rutas_archivos_origen:
+            print("No se encontraron archivos (ni en subcarpetas) en la carpeta de origen.")
+            return 0
+        print(f"Se encontraron {len(lista_rutas_archivos_origen)} archivos para procesar.")
+        plan = planificar(carpeta_origen, usb_raiz_destino, lista_rutas_archivos_origen)
+        print(f"Plan calculado en {time.perf_counter() - t0:.2f} s.")
+
+        if args.simular:
+            guardar_plan(plan, args.plan)
+            print(f"Plan guardado en: {args.plan} (no se movió ningún archivo)")
+            return 0
+
+    t0 = time.perf_counter()
+    archivos_movidos_contador, archivos_fallidos = ejecutar_plan(plan, carpeta_origen, usb_raiz_destino)
+    print(f"Movimiento terminado en {time.perf_counter() - t0:.2f} s. "
+          f"Movidos: {archivos_movidos_contador}. Fallidos: {len(archivos_fallidos)}")
+    return 1 if archivos_fallidos else 0
+
 if __name__ == "__main__":
-    organizar_y_mover_archivos()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        sys.exit(main(sys.argv[1:]))
+    if not TK_AVAILABLE:
+        print("tkinter no está disponible; usa la línea de comandos: musicresort.py ORIGEN DESTINO [--simular]")
+        sys.exit(1)
+    organizar_y_mover_archivos()
@@ -1,73 +1,223 @@
 import xml.etree.ElementTree as ET
 import csv
 import os
+import sqlite3
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
-def parse_cfdi(xml_file):
-    try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
+TFD_NS = 'http://www.sat.gob.mx/TimbreFiscalDigital'
+
+# Complementos soportados: prefijo -> namespace
+NS_COMPLEMENTOS = {
+    'pago20': 'http://www.sat.gob.mx/Pagos20', # Pagos 2.0
+    'nomina12': 'http://www.sat.gob.mx/nomina12', # Nómina 1.2
+}
 
-        # Define namespaces (these might vary slightly)
-        ns = {
-            'cfdi': 'http://www.sat.gob.mx/cfd/4', # o /3 (CFDI 3.3) o /3.3
-            'tfd': 'http://www.sat.gob.mx/TimbreFiscalDigital'
+# Atributos a extraer de cada complemento: prefijo -> [(elemento, [atributos])]
+CAMPOS_COMPLEMENTOS = {
+    'pago20': [
+        ('Totales', ['MontoTotalPagos', 'TotalTrasladosBaseIVA16', 'TotalTrasladosImpuestoIVA16']),
+        ('Pago', ['FechaPago', 'FormaDePagoP', 'MonedaP', 'TipoCambioP', 'Monto']),
+        ('DoctoRelacionado', ['IdDocumento', 'Serie', 'Folio', 'MonedaDR', 'NumParcialidad', 'ImpSaldoAnt', 'ImpPagado', 'ImpSaldoInsoluto']),
+    ],
+    'nomina12': [
+        ('Nomina', ['TipoNomina', 'FechaPago', 'FechaInicialPago', 'FechaFinalPago', 'NumDiasPagados',
+                    'TotalPercepciones', 'TotalDeducciones', 'TotalOtrosPagos']),
+        ('Receptor', ['Curp', 'NumEmpleado', 'Puesto', 'PeriodicidadPago', 'SalarioDiarioIntegrado']),
+    ],
+}
+
+def detectar_ns_cfdi(comprobante_tag):
+    """Devuelve el namespace cfdi según la etiqueta raíz (CFDI 3.3 o 4.0)."""
+    if 'cfd/3' in comprobante_tag: # CFDI 3.3
+        return 'http://www.sat.gob.mx/cfd/3'
+    elif 'cfd/4' in comprobante_tag: # CFDI 4.0
+        return 'http://www.sat.gob.mx/cfd/4'
+    # Older or unknown, default to common one
+    return 'http://www.sat.gob.mx/cfd/3'
+
+class PlanExtraccion:
+    """
+    Plan de extracción precompilado para una versión de CFDI (3.3 o 4.0).
+    Contiene las etiquetas completas para el recorrido con iterparse y,
+    si lxml está instalado, las expresiones XPath ya compiladas.
+    """
+    def __init__(self, ns_cfdi):
+        self.ns_cfdi = ns_cfdi
+        cfdi = '{' + ns_cfdi + '}'
+        self.tags = {
+            'Emisor': cfdi + 'Emisor',
+            'Receptor': cfdi + 'Receptor',
+            'Conceptos': cfdi + 'Conceptos',
+            'Concepto': cfdi + 'Concepto',
+            'Impuestos': cfdi + 'Impuestos',
+            'Traslado': cfdi + 'Traslado',
+            'Retencion': cfdi + 'Retencion',
+            'Complemento': cfdi + 'Complemento',
+            'Timbre': '{' + TFD_NS + '}TimbreFiscalDigital',
+        }
+        # Etiqueta completa de cada elemento de complemento -> (prefijo, elemento, atributos)
+        self.tags_complementos = {
+            '{' + NS_COMPLEMENTOS[prefijo] + '}' + elemento: (prefijo, elemento, atributos)
+            for prefijo, campos in CAMPOS_COMPLEMENTOS.items()
+            for elemento, atributos in campos
         }
+        if LXML_AVAILABLE:
+            ns = {'cfdi': ns_cfdi, 'tfd': TFD_NS, **NS_COMPLEMENTOS}
+            self.xp_emisor = etree.XPath('cfdi:Emisor', namespaces=ns)
+            self.xp_receptor = etree.XPath('cfdi:Receptor', namespaces=ns)
+            self.xp_conceptos = etree.XPath('cfdi:Conceptos/cfdi:Concepto', namespaces=ns)
+            # Relativas al Comprobante (impuestos globales) o a cada Concepto
+            self.xp_traslados = etree.XPath('cfdi:Impuestos/cfdi:Traslados/cfdi:Traslado', namespaces=ns)
+            self.xp_retenciones = etree.XPath('cfdi:Impuestos/cfdi:Retenciones/cfdi:Retencion', namespaces=ns)
+            self.xp_uuid = etree.XPath('cfdi:Complemento/tfd:TimbreFiscalDigital/@UUID', namespaces=ns)
+            self.xp_complementos = [
+                (prefijo, elemento, atributos,
+                 etree.XPath(f'cfdi:Complemento/{prefijo}:*/descendant-or-self::{prefijo}:{elemento}', namespaces=ns))
+                for prefijo, campos in CAMPOS_COMPLEMENTOS.items()
+                for elemento, atributos in campos
+            ]
 
-        # For CFDI 4.0, namespaces might be different.
-        # Example: if root.tag is '{http://www.sat.gob.mx/cfd/4}Comprobante', then ns['cfdi'] is correct.
-        # Adjust if you're using CFDI 3.3.
+@lru_cache(maxsize=None)
+def obtener_plan(comprobante_tag):
+    """Plan de extracción para la etiqueta raíz; se crea una vez por versión y se reutiliza."""
+    return PlanExtraccion(detectar_ns_cfdi(comprobante_tag))
 
-        # --- Extracting data ---
-        # If namespaces are not automatically handled by your ET version for findall,
-        # you might need to prefix them like: root.find('cfdi:Emisor', ns)
+def _nuevo_documento(root):
+    return {
+        'comprobante': dict(root.attrib),
+        'emisor': {},
+        'receptor': {},
+        'conceptos': [],
+        'traslados': [],
+        'retenciones': [],
+        'uuid': '',
+        'complementos': {},
+    }
 
-        # Check for CFDI version (example for finding root tag and its namespace)
-        # This part can be complex due to different CFDI versions.
-        # Assuming CFDI 4.0 for simplicity in path definitions here.
-        # You might need to adapt paths like 'cfdi:Complemento/tfd:TimbreFiscalDigital'
+def _agregar_complemento(documento, prefijo, elemento, atributos, attrib):
+    valores = {a: attrib[a] for a in atributos if a in attrib}
+    documento['complementos'].setdefault(prefijo, {}).setdefault(elemento, []).append(valores)
 
-        comprobante_tag = root.tag
-        if 'cfd/3' in comprobante_tag: # CFDI 3.3
-             ns['cfdi'] = 'http://www.sat.gob.mx/cfd/3'
-        elif 'cfd/4' in comprobante_tag: # CFDI 4.0
-             ns['cfdi'] = 'http://www.sat.gob.mx/cfd/4'
-        else: # Older or unknown, default to common one or raise error
-             ns['cfdi'] = 'http://www.sat.gob.mx/cfd/3' # Default or handle
-             # print(f"Warning: Unknown CFDI version for {xml_file}")
+def _extraer_lxml(xml_file):
+    """Extracción con lxml: un solo parseo en C y XPath precompiladas del plan."""
+    root = etree.parse(xml_file).getroot()
+    plan = obtener_plan(root.tag)
+    documento = _nuevo_documento(root)
+    emisor = plan.xp_emisor(root)
+    receptor = plan.xp_receptor(root)
+    documento['emisor'] = dict(emisor[0].attrib) if emisor else {}
+    documento['receptor'] = dict(receptor[0].attrib) if receptor else {}
+    for concepto in plan.xp_conceptos(root):
+        documento['conceptos'].append({
+            'attrib': dict(concepto.attrib),
+            'traslados': [dict(t.attrib) for t in plan.xp_traslados(concepto)],
+            'retenciones': [dict(r.attrib) for r in plan.xp_retenciones(concepto)],
+        })
+    documento['traslados'] = [dict(t.attrib) for t in plan.xp_traslados(root)]
+    documento['retenciones'] = [dict(r.attrib) for r in plan.xp_retenciones(root)]
+    uuid = plan.xp_uuid(root)
+    documento['uuid'] = str(uuid[0]) if uuid else ''
+    for prefijo, elemento, atributos, xpath in plan.xp_complementos:
+        for nodo in xpath(root):
+            _agregar_complemento(documento, prefijo, elemento, atributos, nodo.attrib)
+    return documento
 
+def _extraer_iterparse(xml_file):
+    """
+    Extracción con la biblioteca estándar en una sola pasada con iterparse.
+    Solo se leen los atributos necesarios y cada nodo se libera (clear) al terminar.
+    """
+    documento = None
+    path = [] # Pila de etiquetas abiertas, path[0] es el Comprobante
+    concepto = None
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if documento is None:
+                plan = obtener_plan(elem.tag)
+                tags = plan.tags
+                documento = _nuevo_documento(elem)
+            path.append(elem.tag)
+            if len(path) == 3 and elem.tag == tags['Concepto'] and path[1] == tags['Conceptos']:
+                # Los atributos ya están disponibles en el evento 'start'
+                concepto = {'attrib': dict(elem.attrib), 'traslados': [], 'retenciones': []}
+            continue
 
-        emisor_node = root.find('cfdi:Emisor', ns)
-        receptor_node = root.find('cfdi:Receptor', ns)
-        conceptos_node = root.find('cfdi:Conceptos', ns)
-        timbre_node = root.find('cfdi:Complemento', ns).find('tfd:TimbreFiscalDigital', ns) if root.find('cfdi:Complemento', ns) is not None else None
+        # event == 'end'
+        depth = len(path)
+        tag = path.pop()
+        if depth == 2:
+            if tag == tags['Emisor']:
+                documento['emisor'] = dict(elem.attrib)
+            elif tag == tags['Receptor']:
+                documento['receptor'] = dict(elem.attrib)
+        elif depth == 3 and tag == tags['Concepto'] and concepto is not None:
+            documento['conceptos'].append(concepto)
+            concepto = None
+        elif depth == 3 and tag == tags['Timbre'] and path[1] == tags['Complemento']:
+            documento['uuid'] = elem.get('UUID', '')
+        elif depth == 4 and path[1] == tags['Impuestos'] and tag in (tags['Traslado'], tags['Retencion']):
+            # Impuestos a nivel comprobante
+            documento['traslados' if tag == tags['Traslado'] else 'retenciones'].append(dict(elem.attrib))
+        elif depth == 6 and concepto is not None and path[3] == tags['Impuestos'] and tag in (tags['Traslado'], tags['Retencion']):
+            # Concepto/Impuestos/Traslados/Traslado o Concepto/Impuestos/Retenciones/Retencion
+            concepto['traslados' if tag == tags['Traslado'] else 'retenciones'].append(dict(elem.attrib))
+        elif depth > 2 and tag in plan.tags_complementos and path[1] == tags['Complemento']:
+            _agregar_complemento(documento, *plan.tags_complementos[tag], elem.attrib)
+        if depth > 1:
+            elem.clear()
+    return documento
 
+def extraer_documento(xml_file):
+    """
+    Extrae en una sola lectura todo lo que usan las exportaciones: atributos del comprobante,
+    emisor, receptor, conceptos con sus impuestos, impuestos globales, UUID y complementos.
+    Usa lxml con XPath compiladas si está instalado; si no, iterparse de la biblioteca estándar.
+    """
+    if LXML_AVAILABLE:
+        return _extraer_lxml(xml_file)
+    return _extraer_iterparse(xml_file)
 
-        proveedor_rfc = emisor_node.get('Rfc') if emisor_node is not None else ''
-        proveedor_nombre = emisor_node.get('Nombre') if emisor_node is not None else ''
+def parse_cfdi(xml_file):
+    """Extrae los datos del gasto (un registro por factura) de un CFDI."""
+    try:
+        documento = extraer_documento(xml_file)
+        comprobante = documento['comprobante']
+        emisor = documento['emisor']
+
+        proveedor_rfc = emisor.get('Rfc', '')
+        proveedor_nombre = emisor.get('Nombre', '')
 
-        # Asumiendo un solo concepto para simplificar, o puedes iterar
-        primer_concepto = conceptos_node.find('cfdi:Concepto', ns) if conceptos_node is not None else None
+        # Asumiendo un solo concepto para simplificar: se toma el primero
+        primer_concepto = documento['conceptos'][0]['attrib'] if documento['conceptos'] else None
         descripcion = primer_concepto.get('Descripcion') if primer_concepto is not None else ''
         cantidad = float(primer_concepto.get('Cantidad', 0)) if primer_concepto is not None else 0
         valor_unitario = float(primer_concepto.get('ValorUnitario', 0)) if primer_concepto is not None else 0
 
-        subtotal = float(root.get('SubTotal', 0))
-        total = float(root.get('Total', 0))
-        fecha = root.get('Fecha')
-        folio_factura = root.get('Folio') # Folio interno, puede no estar
-        serie_factura = root.get('Serie') # Serie interna, puede no estar
-        uuid = timbre_node.get('UUID') if timbre_node is not None else ''
+        subtotal = float(comprobante.get('SubTotal', 0))
+        total = float(comprobante.get('Total', 0))
+        fecha = comprobante.get('Fecha')
+        folio_factura = comprobante.get('Folio') # Folio interno, puede no estar
+        serie_factura = comprobante.get('Serie') # Serie interna, puede no estar
+        uuid = documento['uuid']
 
-        # Extracción de impuestos (simplificado, puede ser más complejo)
-        # Deberás sumar los IVAs, por ejemplo.
+        # Impuestos a nivel comprobante (no los de cada concepto)
         iva_total = 0
-        impuestos_node = root.find('cfdi:Impuestos', ns)
-        if impuestos_node is not None:
-            traslados_node = impuestos_node.find('cfdi:Traslados', ns)
-            if traslados_node is not None:
-                for traslado in traslados_node.findall('cfdi:Traslado', ns):
-                    if traslado.get('Impuesto') == '002': # IVA
-                        iva_total += float(traslado.get('Importe', 0))
+        for traslado in documento['traslados']:
+            if traslado.get('Impuesto') == '002': # IVA
+                iva_total += float(traslado.get('Importe', 0))
 
         return {
             'Descripcion Gasto': descripcion,
@@ -81,17 +231,14 @@ def parse_cfdi(xml_file):
             'Folio Fiscal (UUID)': uuid,
             'Total': total,
             'IVA (Monto)': iva_total,
-            'Subtotal (Antes de Impuestos)': subtotal
+            'Subtotal (Antes de Impuestos)': subtotal,
+            'Complementos': documento['complementos'], # Pagos 2.0 / Nómina 1.2, si existen
             # Añade más campos según la plantilla de importación de Odoo Gastos
         }
     except Exception as e:
         print(f"Error procesando {xml_file}: {e}")
         return None
 
-# --- Script Principal ---
-xml_folder = r'C:\Users\axelg\Documents\CFiles\PBScripts\MisFacturasCFDI'
-output_csv = 'gastos_para_odoo.csv'
-
 # Define los encabezados del CSV según la plantilla de importación de Odoo
 # Esto es un ejemplo, ajústalo!
 # Puedes obtener los encabezados exactos exportando un gasto desde Odoo.
@@ -115,32 +262,333 @@ fieldnames = [
     # o puedes especificar los impuestos por su nombre o ID.
 ]
 
-all_data = []
-for filename in os.listdir(xml_folder):
-    if filename.endswith('.xml'):
-        xml_path = os.path.join(xml_folder, filename)
+def a_registro_odoo(data):
+    """Mapea los datos extraídos a los nombres de columna de Odoo."""
+    return {
+        'name': data['Descripcion Gasto'],
+        'product_id/name': data['Producto (Nombre)'], # Asegúrate que este producto exista en Odoo o permita creación
+        'unit_amount': data['Precio Unitario'], # O el total si es un gasto simple
+        'quantity': data['Cantidad'] if data['Cantidad'] > 0 else 1,
+        'date': data['Fecha Factura'],
+        'partner_id/name': data['Proveedor (Nombre)'],
+        'partner_id/vat': data['Proveedor (RFC)'],
+        'reference': data['Numero Factura'] if data['Numero Factura'] != data['Folio Fiscal (UUID)'] else '', # Si es distinto al UUID
+        'l10n_mx_edi_cfdi_uuid': data['Folio Fiscal (UUID)'],
+        'amount_total': data['Total'] # Odoo usualmente recalcula esto basado en precio unitario, cantidad e impuestos.
+    }
+
+class LedgerCFDI:
+    """
+    Registro persistente (SQLite) de los CFDI ya exportados.
+    Se indexa por archivo (ruta + mtime + tamaño) para no volver a leer XMLs sin cambios,
+    y por UUID del TimbreFiscalDigital para detectar facturas duplicadas con otro nombre.
+    """
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archivos (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                uuid TEXT
+            );
+            CREATE TABLE IF NOT EXISTS uuids (
+                uuid TEXT PRIMARY KEY,
+                path TEXT,
+                exportado TEXT
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def sin_cambios(self, path, mtime, size):
+        """True si el archivo ya se procesó con el mismo mtime y tamaño."""
+        row = self.conn.execute("SELECT mtime, size FROM archivos WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == mtime and row[1] == size
+
+    def ruta_de_uuid(self, uuid):
+        """Ruta del archivo con el que se exportó este UUID, o None."""
+        row = self.conn.execute("SELECT path FROM uuids WHERE uuid = ?", (uuid,)).fetchone()
+        return row[0] if row else None
+
+    def registrar(self, path, mtime, size, uuid, exportado=True):
+        self.conn.execute("INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?)", (path, mtime, size, uuid))
+        if uuid and exportado:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO uuids VALUES (?, ?, ?)",
+                (uuid, path, datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def commit(self):
+        self.conn.commit()
+
+def procesar_lote(xml_paths):
+    """Procesa un lote de XMLs en un proceso trabajador y devuelve [(ruta, registro_odoo)]."""
+    registros = []
+    for xml_path in xml_paths:
         data = parse_cfdi(xml_path)
         if data:
-            # Mapear los datos extraídos a los nombres de columna de Odoo
-            odoo_expense_record = {
-                'name': data['Descripcion Gasto'],
-                'product_id/name': data['Producto (Nombre)'], # Asegúrate que este producto exista en Odoo o permita creación
-                'unit_amount': data['Precio Unitario'], # O el total si es un gasto simple
-                'quantity': data['Cantidad'] if data['Cantidad'] > 0 else 1,
-                'date': data['Fecha Factura'],
-                'partner_id/name': data['Proveedor (Nombre)'],
-                'partner_id/vat': data['Proveedor (RFC)'],
-                'reference': data['Numero Factura'] if data['Numero Factura'] != data['Folio Fiscal (UUID)'] else '', # Si es distinto al UUID
-                'l10n_mx_edi_cfdi_uuid': data['Folio Fiscal (UUID)'],
-                'amount_total': data['Total'] # Odoo usualmente recalcula esto basado en precio unitario, cantidad e impuestos.
+            registros.append((xml_path, a_registro_odoo(data)))
+    return registros
+
+def exportar_carpeta(xml_folder, output_csv, workers=None, chunk_size=200, ledger_path=None):
+    """
+    Procesa los XML de xml_folder en paralelo (ProcessPoolExecutor, por lotes)
+    y escribe cada lote en el CSV en cuanto llega, sin acumular todos los registros.
+    Con ledger_path solo se procesan archivos nuevos o modificados y se omiten (avisando)
+    los UUID que ya se exportaron desde otro archivo. El CSV se reescribe siempre (solo
+    encabezados si no hay registros nuevos) y el registro se confirma cuando el CSV ya
+    está cerrado, así nunca marca como exportadas filas que no llegaron al archivo.
+    Devuelve el número de registros escritos.
+    """
+    ledger = LedgerCFDI(ledger_path) if ledger_path else None
+    xml_stats = {}
+    omitidos = 0
+    for entry in os.scandir(xml_folder):
+        if not entry.name.endswith('.xml'):
+            continue
+        st = entry.stat()
+        if ledger and ledger.sin_cambios(entry.path, st.st_mtime, st.st_size):
+            omitidos += 1
+            continue
+        xml_stats[entry.path] = (st.st_mtime, st.st_size)
+    if ledger:
+        print(f"Archivos sin cambios omitidos: {omitidos}. Nuevos o modificados: {len(xml_stats)}")
+
+    xml_paths = list(xml_stats)
+    lotes = [xml_paths[i:i + chunk_size] for i in range(0, len(xml_paths), chunk_size)]
+
+    total = 0
+    duplicados = 0
+    try:
+        with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            if lotes:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # map conserva el orden de los lotes, así el CSV sale igual que en serie
+                    for registros in executor.map(procesar_lote, lotes):
+                        nuevos = []
+                        for xml_path, registro in registros:
+                            if ledger:
+                                uuid = registro['l10n_mx_edi_cfdi_uuid']
+                                ruta_previa = ledger.ruta_de_uuid(uuid) if uuid else None
+                                duplicado = ruta_previa is not None and ruta_previa != xml_path
+                                if duplicado:
+                                    print(f"UUID duplicado {uuid}: '{xml_path}' ya se exportó como '{ruta_previa}'")
+                                    duplicados += 1
+                                ledger.registrar(xml_path, *xml_stats[xml_path], uuid, exportado=not duplicado)
+                                if duplicado:
+                                    continue
+                            nuevos.append(registro)
+                        writer.writerows(nuevos)
+                        total += len(nuevos)
+        # Sólo con el CSV completo y cerrado se confirma el registro; si algo falla antes,
+        # close() descarta la transacción y la siguiente ejecución vuelve a procesar esos XML
+        if ledger:
+            ledger.commit()
+    finally:
+        if ledger:
+            ledger.close()
+    if duplicados:
+        print(f"UUID duplicados omitidos: {duplicados}")
+    return total
+
+# --- Exportación por concepto (una fila por cfdi:Concepto) ---
+
+# Claves de impuesto del SAT
+IMPUESTOS_SAT = {'001': 'isr', '002': 'iva', '003': 'ieps'}
+
+# Columnas de la tabla de conceptos: (nombre, tipo)
+COLUMNAS_CONCEPTOS = [
+    ('archivo', 'str'),
+    ('uuid', 'str'),
+    ('version', 'str'),
+    ('tipo_comprobante', 'str'),
+    ('fecha', 'str'),
+    ('serie', 'str'),
+    ('folio', 'str'),
+    ('moneda', 'str'),
+    ('emisor_rfc', 'str'),
+    ('emisor_nombre', 'str'),
+    ('receptor_rfc', 'str'),
+    ('receptor_nombre', 'str'),
+    ('concepto_num', 'int'),
+    ('clave_prod_serv', 'str'),
+    ('no_identificacion', 'str'),
+    ('clave_unidad', 'str'),
+    ('descripcion', 'str'),
+    ('cantidad', 'float'),
+    ('valor_unitario', 'float'),
+    ('importe', 'float'),
+    ('descuento', 'float'),
+    ('traslado_iva', 'float'),
+    ('traslado_ieps', 'float'),
+    ('retencion_isr', 'float'),
+    ('retencion_iva', 'float'),
+    ('retencion_ieps', 'float'),
+    ('total_traslados', 'float'),
+    ('total_retenciones', 'float'),
+]
+NOMBRES_COLUMNAS_CONCEPTOS = [nombre for nombre, _ in COLUMNAS_CONCEPTOS]
+
+def parse_cfdi_conceptos(xml_file):
+    """
+    Extrae todos los conceptos de un CFDI, cada uno con sus propios traslados y retenciones.
+    Devuelve una lista de filas (dict con las claves de COLUMNAS_CONCEPTOS) o None si hay error.
+    """
+    try:
+        documento = extraer_documento(xml_file)
+        comprobante = documento['comprobante']
+        emisor = documento['emisor']
+        receptor = documento['receptor']
+        fecha = comprobante.get('Fecha')
+        encabezado = {
+            'archivo': os.path.basename(xml_file),
+            'uuid': documento['uuid'],
+            'version': comprobante.get('Version', ''),
+            'tipo_comprobante': comprobante.get('TipoDeComprobante', ''),
+            'fecha': fecha.split('T')[0] if fecha else '',
+            'serie': comprobante.get('Serie', ''),
+            'folio': comprobante.get('Folio', ''),
+            'moneda': comprobante.get('Moneda', ''),
+            'emisor_rfc': emisor.get('Rfc', ''),
+            'emisor_nombre': emisor.get('Nombre', ''),
+            'receptor_rfc': receptor.get('Rfc', ''),
+            'receptor_nombre': receptor.get('Nombre', ''),
+        }
+
+        filas = []
+        for num, concepto in enumerate(documento['conceptos'], 1):
+            attrib = concepto['attrib']
+            fila = {
+                **encabezado,
+                'concepto_num': num,
+                'clave_prod_serv': attrib.get('ClaveProdServ', ''),
+                'no_identificacion': attrib.get('NoIdentificacion', ''),
+                'clave_unidad': attrib.get('ClaveUnidad', ''),
+                'descripcion': attrib.get('Descripcion', ''),
+                'cantidad': float(attrib.get('Cantidad', 0)),
+                'valor_unitario': float(attrib.get('ValorUnitario', 0)),
+                'importe': float(attrib.get('Importe', 0)),
+                'descuento': float(attrib.get('Descuento', 0)),
+                'traslado_iva': 0.0,
+                'traslado_ieps': 0.0,
+                'retencion_isr': 0.0,
+                'retencion_iva': 0.0,
+                'retencion_ieps': 0.0,
+                'total_traslados': 0.0,
+                'total_retenciones': 0.0,
             }
-            all_data.append(odoo_expense_record)
-
-if all_data:
-    with open(output_csv, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(all_data)
-    print(f"Archivo CSV '{output_csv}' generado con {len(all_data)} registros.")
-else:
-    print("No se procesaron datos.")
\ No newline at end of file
+            for prefijo, columna_total, impuestos in (
+                ('traslado', 'total_traslados', concepto['traslados']),
+                ('retencion', 'total_retenciones', concepto['retenciones']),
+            ):
+                for impuesto in impuestos:
+                    importe = float(impuesto.get('Importe', 0)) # Los traslados exentos no traen Importe
+                    fila[columna_total] += importe
+                    columna = f"{prefijo}_{IMPUESTOS_SAT.get(impuesto.get('Impuesto'), '')}"
+                    if columna in fila:
+                        fila[columna] += importe
+            filas.append(fila)
+        return filas
+    except Exception as e:
+        print(f"Error procesando {xml_file}: {e}")
+        return None
+
+def procesar_lote_conceptos(xml_paths):
+    """Procesa un lote de XMLs en un proceso trabajador y devuelve todas sus filas de conceptos."""
+    filas = []
+    for xml_path in xml_paths:
+        conceptos = parse_cfdi_conceptos(xml_path)
+        if conceptos:
+            filas.extend(conceptos)
+    return filas
+
+class EscritorConceptos:
+    """
+    Escribe la tabla de conceptos por lotes en CSV, Parquet o Arrow IPC.
+    Parquet y Arrow requieren pyarrow y guardan los datos en columnas con tipos fijos.
+    """
+    FORMATOS = ('csv', 'parquet', 'arrow')
+
+    def __init__(self, output_path, formato='csv'):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}. Usa uno de {self.FORMATOS}")
+        if formato != 'csv' and not PYARROW_AVAILABLE:
+            raise RuntimeError(
+                f"La biblioteca 'pyarrow' es necesaria para exportar en formato {formato}.\n"
+                "Por favor, instálala con: pip install pyarrow"
+            )
+        self.formato = formato
+        if formato == 'csv':
+            self.file = open(output_path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.DictWriter(self.file, fieldnames=NOMBRES_COLUMNAS_CONCEPTOS)
+            self.writer.writeheader()
+        else:
+            tipos = {'str': pa.string(), 'int': pa.int32(), 'float': pa.float64()}
+            self.schema = pa.schema([(nombre, tipos[tipo]) for nombre, tipo in COLUMNAS_CONCEPTOS])
+            if formato == 'parquet':
+                self.writer = pq.ParquetWriter(output_path, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(output_path, self.schema)
+
+    def escribir(self, filas):
+        if not filas:
+            return
+        if self.formato == 'csv':
+            self.writer.writerows(filas)
+            return
+        columnas = {nombre: [fila[nombre] for fila in filas] for nombre in NOMBRES_COLUMNAS_CONCEPTOS}
+        tabla = pa.Table.from_pydict(columnas, schema=self.schema)
+        self.writer.write_table(tabla)
+
+    def close(self):
+        if self.formato == 'csv':
+            self.file.close()
+        else:
+            self.writer.close()
+
+def exportar_conceptos(xml_folder, output_path, formato='csv', workers=None, chunk_size=200):
+    """
+    Exporta una fila por concepto de todos los XML de xml_folder (en paralelo, por lotes).
+    Devuelve el número de filas escritas.
+    """
+    xml_paths = [
+        os.path.join(xml_folder, filename)
+        for filename in os.listdir(xml_folder)
+        if filename.endswith('.xml')
+    ]
+    lotes = [xml_paths[i:i + chunk_size] for i in range(0, len(xml_paths), chunk_size)]
+
+    total = 0
+    escritor = EscritorConceptos(output_path, formato)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for filas in executor.map(procesar_lote_conceptos, lotes):
+                escritor.escribir(filas)
+                total += len(filas)
+    finally:
+        escritor.close()
+    return total
+
+if __name__ == '__main__':
+    # --- Script Principal ---
+    xml_folder = r'C:\Users\axelg\Documents\CFiles\PBScripts\MisFacturasCFDI'
+    output_csv = 'gastos_para_odoo.csv'
+    ledger_path = 'cfdi_exportados.sqlite' # Registro de facturas ya exportadas
+    # Tabla con una fila por concepto: 'csv', 'parquet' o 'arrow' (None para no generarla)
+    conceptos_formato = None
+    conceptos_output = 'conceptos_cfdi'
+
+    total = exportar_carpeta(xml_folder, output_csv, ledger_path=ledger_path)
+    if total:
+        print(f"Archivo CSV '{output_csv}' generado con {total} registros.")
+    else:
+        print(f"No se procesaron datos nuevos; '{output_csv}' queda solo con los encabezados.")
+
+    if conceptos_formato:
+        conceptos_path = f"{conceptos_output}.{conceptos_formato}"
+        filas = exportar_conceptos(xml_folder, conceptos_path, conceptos_formato)
+        print(f"Archivo '{conceptos_path}' generado con {filas} conceptos.")
@@ -2,6 +2,41 @@ import fitz  # PyMuPDF
 import os
 import sys
 import re
+import time
+import glob
+import csv
+import json
+import argparse
+import tempfile
+import warnings
+import hashlib
+import shutil
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import freeze_support
+
+# Modo paralelo: número de procesos y páginas que procesa cada uno por bloque.
+# Con PROCESOS = 1 o documentos de hasta PAGINAS_POR_BLOQUE páginas se procesa en secuencia.
+PROCESOS = os.cpu_count() or 1
+PAGINAS_POR_BLOQUE = 100
+
+# Extracción del nombre: "texto" (página completa), "recorte" (solo RECORTE_NOMBRE)
+# o "ancla" (solo la línea de la etiqueta, ver ExtractorNombre)
+MODO_EXTRACCION = "texto"
+RECORTE_NOMBRE = None # (x0, y0, x1, y1) en puntos, para el modo "recorte"
+
+# Perfiles de guardado de cada página exportada:
+#   "predeterminado": save() sin opciones (comportamiento original, lo más rápido de escribir)
+#   "compacto": subconjunto de fuentes, elimina objetos duplicados y comprime flujos, imágenes y fuentes
+PERFILES_GUARDADO = {
+    "predeterminado": {"subset_fonts": False, "opciones": {}},
+    "compacto": {
+        "subset_fonts": True,
+        "opciones": {"garbage": 3, "deflate": True, "deflate_images": True, "deflate_fonts": True, "use_objstms": 1},
+    },
+}
+PERFIL_GUARDADO = "predeterminado"
+LINEALIZAR = False # Linealización ("fast web view"); se omite si la versión de MuPDF no la soporta
 
 def limpiar_nombre_archivo(nombre):
     """
@@ -24,102 +59,541 @@ def limpiar_nombre_archivo(nombre):
         return "nombre_invalido_o_vacio"
     return nombre
 
-def procesar_pdf(pdf_path):
+class ExtractorNombre:
     """
-    Procesa el archivo PDF, extrae páginas y las guarda con el nombre encontrado.
+    Extrae el nombre que sigue a la etiqueta "Nombre" en una página.
+
+    Modos:
+      - "texto":  extrae el texto de toda la página (comportamiento original).
+      - "recorte": extrae solo el texto dentro del rectángulo `recorte` (x0, y0, x1, y1) en puntos.
+      - "ancla":  localiza la etiqueta con search_for y lee solo las palabras de esa línea
+                  (o de la siguiente si el nombre está debajo). Cada página se resuelve por
+                  separado, así el resultado no depende del orden ni del reparto entre procesos.
     """
+    MODOS = ("texto", "recorte", "ancla")
+
+    def __init__(self, modo="texto", recorte=None, etiqueta="Nombre"):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de extracción no válido: {modo}. Usa uno de {self.MODOS}")
+        if modo == "recorte" and not recorte:
+            raise ValueError("El modo 'recorte' requiere un rectángulo (x0, y0, x1, y1)")
+        self.modo = modo
+        self.recorte = fitz.Rect(recorte) if recorte else None
+        self.etiqueta = etiqueta
+        # Se buscan variaciones comunes como "Nombre:", "Nombre ", etc.
+        self.patron = re.compile(re.escape(etiqueta) + r"[:\s]+([^\n]+)", re.IGNORECASE)
+
+    def extraer(self, page):
+        """Devuelve el nombre encontrado en la página o None."""
+        if self.modo == "texto":
+            return self._buscar(page.get_text("text"))
+        if self.modo == "recorte":
+            return self._buscar(page.get_text("text", clip=self.recorte))
+        return self._extraer_por_ancla(page)
+
+    def _buscar(self, text):
+        match = self.patron.search(text)
+        if match and match.group(1).strip():
+            return match.group(1).strip()
+        return None
+
+    def _extraer_por_ancla(self, page):
+        rects = page.search_for(self.etiqueta)
+        if not rects:
+            return None
+        r = rects[0]
+        # Solo la línea de la etiqueta y la siguiente, desde la etiqueta hasta el margen derecho
+        franja = fitz.Rect(r.x0 - 2, r.y0 - 2, page.rect.x1, r.y1 + r.height + 2)
+        palabras = page.get_text("words", clip=franja, sort=True)
+        etiqueta = next((w for w in palabras if fitz.Rect(w[:4]).intersects(r)), None)
+        if etiqueta is None:
+            return None
+        linea = (etiqueta[5], etiqueta[6])
+        # Palabras a la derecha de la etiqueta en la misma línea
+        nombre = " ".join(w[4] for w in palabras if (w[5], w[6]) == linea and w[7] > etiqueta[7])
+        nombre = nombre.lstrip(": ").strip()
+        if not nombre:
+            # Alternativa: el nombre está en la línea siguiente, la más cercana por debajo
+            # de la etiqueta según el centro vertical de sus palabras
+            centro = (etiqueta[1] + etiqueta[3]) / 2
+            mitad = (etiqueta[3] - etiqueta[1]) / 2
+            lineas = {}
+            for w in palabras:
+                if (w[1] + w[3]) / 2 > centro + mitad:
+                    lineas.setdefault((w[5], w[6]), []).append(w)
+            if lineas:
+                siguiente = min(lineas.values(), key=lambda ws: sum((w[1] + w[3]) / 2 for w in ws) / len(ws))
+                nombre = " ".join(w[4] for w in sorted(siguiente, key=lambda w: w[0])).strip()
+        return nombre or None
+
+def asignar_nombre_archivo(nombre_extraido, numero_pagina, nombres_usados):
+    """
+    Devuelve el nombre final (sin extensión) para la página y actualiza nombres_usados.
+    Se llama en orden de página para que los sufijos de duplicados sean siempre los mismos.
+    """
+    if not nombre_extraido:
+        # Esto no debería ocurrir si se usa el nombre genérico, pero por si acaso
+        return limpiar_nombre_archivo(f"pagina_{numero_pagina}_error_extraccion")
+    nombre_limpio = limpiar_nombre_archivo(nombre_extraido)
+
+    # Manejo de nombres duplicados
+    contador = nombres_usados.get(nombre_limpio, 0) + 1
+    nombres_usados[nombre_limpio] = contador
+
+    if contador > 1:
+        return f"{nombre_limpio}_{contador-1}" # El primer archivo no lleva sufijo, el segundo _1, etc.
+    return nombre_limpio
+
+def guardar_pagina(doc, i, output_pdf_path, perfil=PERFIL_GUARDADO, linealizar=LINEALIZAR):
+    """Crea un nuevo PDF con solo la página i del documento, guardado según el perfil."""
+    config = PERFILES_GUARDADO[perfil]
+    opciones = dict(config["opciones"])
+    new_doc = fitz.open() # Documento PDF vacío
+    new_doc.insert_pdf(doc, from_page=i, to_page=i) # Insertar la página actual
     try:
-        doc = fitz.open(pdf_path)
-    except Exception as e:
-        print(f"Error al abrir el archivo PDF: {e}")
-        input("Presiona Enter para salir.")
-        return
+        if config["subset_fonts"]:
+            try:
+                new_doc.subset_fonts()
+            except Exception:
+                pass # Si alguna fuente no se puede recortar se guarda completa
+        if linealizar:
+            opciones.pop("use_objstms", None) # No es compatible con la linealización
+            try:
+                new_doc.save(output_pdf_path, linear=True, **opciones)
+                return
+            except Exception as e:
+                warnings.warn(f"No se pudo linealizar, se guarda sin linealizar: {e}")
+        new_doc.save(output_pdf_path, **opciones)
+    finally:
+        new_doc.close()
 
-    # Crear un directorio para los PDFs de salida
-    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    output_dir = os.path.join(os.path.dirname(pdf_path), f"{base_name}_paginas_exportadas")
+# --- Caché de páginas por contenido ---
 
-    if not os.path.exists(output_dir):
-        try:
-            os.makedirs(output_dir)
-            print(f"Directorio de salida creado: {output_dir}")
-        except Exception as e:
-            print(f"Error al crear el directorio de salida: {e}")
-            input("Presiona Enter para salir.")
-            return
-    else:
-        print(f"Directorio de salida ya existe: {output_dir}")
+# Reutilizar páginas sin cambios de ejecuciones anteriores. Desactivado por defecto:
+# activarlo (o usar --con-cache) sólo cuando se reprocesan los mismos PDFs a menudo
+CACHE_PAGINAS = False
+CACHE_FILENAME = ".pdfnombres_cache.sqlite" # Se guarda junto al PDF de entrada
+
+class CachePaginas:
+    """
+    Caché persistente (SQLite) archivo de salida -> (hash de página, nombre extraído).
+    Varias salidas pueden tener el mismo hash (páginas idénticas dentro de un documento).
+    """
+    def __init__(self, directorio):
+        # WAL y commit por página: varios procesos del modo por lotes pueden compartir la caché
+        self.conn = sqlite3.connect(os.path.join(directorio, CACHE_FILENAME), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                salida TEXT PRIMARY KEY,
+                hash TEXT,
+                nombre TEXT
+            );
+            CREATE INDEX IF NOT EXISTS paginas_hash ON paginas(hash);
+        """)
+
+    def cargar(self):
+        """Devuelve [(salida, hash, nombre)]."""
+        return self.conn.execute("SELECT salida, hash, nombre FROM paginas").fetchall()
+
+    def guardar(self, hash_pagina, nombre, salida):
+        self.conn.execute("INSERT OR REPLACE INTO paginas VALUES (?, ?, ?)", (salida, hash_pagina, nombre))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+# Referencias indirectas ("12 0 R") y la referencia al árbol de páginas, que no es contenido
+_REFERENCIA_RE = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+_PARENT_RE = re.compile(rb"/Parent\s+\d+\s+\d+\s+R")
+
+def _hash_objeto(doc, xref, memo, en_curso):
+    """
+    Hash de un objeto PDF y de todo lo que referencia (recursivo): su definición, su flujo
+    si lo tiene y los hashes de los objetos referenciados, en orden de aparición. Los números
+    de xref no entran en el hash, así que un mismo contenido reeditado produce el mismo valor.
+    `memo` guarda los objetos ya calculados (recursos compartidos entre páginas).
+    """
+    if xref in memo:
+        return memo[xref]
+    if xref in en_curso or xref <= 0 or xref >= doc.xref_length():
+        return b"ciclo"
+    en_curso.add(xref)
+    h = hashlib.sha256()
+    definicion = _PARENT_RE.sub(b"", doc.xref_object(xref, compressed=True).encode("latin-1", errors="replace"))
+    h.update(_REFERENCIA_RE.sub(b"R", definicion))
+    if doc.xref_is_stream(xref):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for ref in _REFERENCIA_RE.finditer(definicion):
+        h.update(_hash_objeto(doc, int(ref.group(1)), memo, en_curso))
+    en_curso.discard(xref)
+    memo[xref] = h.digest()
+    return memo[xref]
 
-    print(f"Procesando {doc.page_count} páginas...")
+def hash_pagina(doc, page, firma, memo=None):
+    """
+    Hash del contenido de la página: el objeto de la página con todo lo que referencia
+    (flujos de contenido, /Resources con Form XObjects, imágenes y fuentes, anotaciones),
+    más la firma de la configuración (modo de extracción, perfil de guardado y linealización).
+    """
+    h = hashlib.sha256(firma.encode("utf-8"))
+    h.update(_hash_objeto(doc, page.xref, memo if memo is not None else {}, set()))
+    return h.hexdigest()
 
-    nombres_usados = {} # Para manejar nombres de archivo duplicados
+def _firma(opciones):
+    return repr((opciones['modo'], opciones['recorte'], opciones['perfil'], opciones['linealizar']))
 
-    for i in range(doc.page_count):
+def _iterar_rango(doc, output_dir, inicio, fin, opciones, cache_conocida):
+    """
+    Procesa las páginas [inicio, fin): si el hash está en caché y su archivo existe, se omite
+    la extracción y el guardado; si no, se extrae el nombre y se guarda con un nombre temporal.
+    Genera (i, nombre_extraido, ruta_temporal, error, segundos, hash, de_cache).
+    """
+    extractor = ExtractorNombre(opciones['modo'], opciones['recorte'])
+    firma = _firma(opciones)
+    memo_hash = {}
+    for i in range(inicio, fin):
+        t0 = time.perf_counter()
         page = doc.load_page(i)
-        text = page.get_text("text") # Extraer texto plano
+        h = hash_pagina(doc, page, firma, memo_hash) if cache_conocida is not None else None
+        previo = cache_conocida.get(h) if h else None
+        if previo is not None and os.path.exists(previo[1]):
+            yield i, previo[0], None, None, time.perf_counter() - t0, h, True
+            continue
+        nombre_extraido = extractor.extraer(page)
+        ruta_temporal = os.path.join(output_dir, f".tmp_pagina_{i+1}.pdf")
+        error = None
+        try:
+            guardar_pagina(doc, i, ruta_temporal, opciones['perfil'], opciones['linealizar'])
+        except Exception as e:
+            error = str(e)
+        yield i, nombre_extraido, ruta_temporal, error, time.perf_counter() - t0, h, False
 
-        nombre_extraido = None
-        # Intentar encontrar "Nombre" y extraer el texto que sigue
-        # Se buscan variaciones comunes como "Nombre:", "Nombre ", etc.
-        match = re.search(r"Nombre[:\s]+([^\n]+)", text, re.IGNORECASE)
-        if match:
-            nombre_extraido = match.group(1).strip()
+def procesar_rango(pdf_path, output_dir, inicio, fin, opciones, cache_conocida):
+    """
+    Trabajador del modo paralelo: abre su propia copia del documento y procesa las páginas
+    [inicio, fin). Devuelve la lista de resultados de _iterar_rango.
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        return list(_iterar_rango(doc, output_dir, inicio, fin, opciones, cache_conocida))
+    finally:
+        doc.close()
+
+def _registrar_pagina(pdf_path, i, nombre_extraido, output_pdf_path, segundos, error, origen, log):
+    """Crea la entrada del manifiesto para una página e informa el resultado."""
+    if log:
+        if error is not None:
+            log(f"Error al guardar la página {i+1} ({output_pdf_path}): {error}")
+        elif origen == 'omitida':
+            log(f"Página {i+1} sin cambios: {output_pdf_path}")
+        elif origen == 'enlazada':
+            log(f"Página {i+1} sin cambios, enlazada como: {output_pdf_path}")
         else:
-            # Intento alternativo si "Nombre" está al final de una línea y el nombre en la siguiente
-            # Esto es más complejo y requeriría un análisis más profundo del formato del PDF
-            # Por ahora, nos enfocamos en el caso más simple
-            print(f"Página {i+1}: No se encontró 'Nombre:' seguido de texto en la misma línea.")
-            # Si no se encuentra un nombre, se puede usar un nombre genérico o pedir al usuario.
-            # Aquí usamos un nombre genérico.
+            log(f"Página {i+1} guardada como: {output_pdf_path}")
+    return {
+        'archivo': pdf_path,
+        'pagina': i + 1,
+        'nombre': nombre_extraido or '',
+        'salida': output_pdf_path if error is None else '',
+        'segundos': round(segundos, 4),
+        'error': error or '',
+        'cache': origen,
+    }
+
+class _ColocadorPaginas:
+    """
+    Asigna los nombres finales en orden de página y coloca cada resultado en su ruta:
+    renombra el temporal, o para páginas en caché, la deja como está o la enlaza (hardlink).
+    """
+    def __init__(self, pdf_path, output_dir, opciones, cache, log):
+        self.pdf_path = pdf_path
+        self.output_dir = output_dir
+        self.opciones = opciones
+        self.cache = cache
+        self.log = log
+        self.nombres_usados = {} # Para manejar nombres de archivo duplicados
+        # Archivo de salida -> hash y hash -> archivos de salida (según caché y esta ejecución)
+        self.por_salida = {}
+        self.salidas_de = {}
+        for salida, h, _ in (cache.cargar() if cache else []):
+            self._asociar(salida, h)
+        self.doc = None
+
+    def colocar(self, resultado):
+        i, nombre_extraido, ruta_temporal, error, segundos, h, de_cache = resultado
+        nombre_encontrado = nombre_extraido
+        if not nombre_extraido:
+            if self.log:
+                self.log(f"Página {i+1}: No se encontró 'Nombre:' seguido de texto en la misma línea.")
             nombre_extraido = f"pagina_{i+1}_sin_nombre_identificado"
+        nombre_archivo_final = asignar_nombre_archivo(nombre_extraido, i + 1, self.nombres_usados)
+        output_pdf_path = os.path.join(self.output_dir, f"{nombre_archivo_final}.pdf")
+        origen = ''
+        try:
+            if de_cache:
+                origen = self._reutilizar(i, h, output_pdf_path)
+            else:
+                if error is None:
+                    os.replace(ruta_temporal, output_pdf_path)
+        except Exception as e:
+            error = str(e)
+        if ruta_temporal and os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        if error is None and h:
+            self._asociar(output_pdf_path, h)
+            self.cache.guardar(h, nombre_encontrado, output_pdf_path)
+        return _registrar_pagina(self.pdf_path, i, nombre_encontrado, output_pdf_path, segundos, error, origen, self.log)
 
+    def _asociar(self, salida, h):
+        anterior = self.por_salida.get(salida)
+        if anterior is not None:
+            self.salidas_de[anterior].discard(salida)
+        self.por_salida[salida] = h
+        self.salidas_de.setdefault(h, set()).add(salida)
 
-        if nombre_extraido:
-            nombre_limpio = limpiar_nombre_archivo(nombre_extraido)
-            
-            # Manejo de nombres duplicados
-            contador = nombres_usados.get(nombre_limpio, 0) + 1
-            nombres_usados[nombre_limpio] = contador
-            
-            nombre_archivo_final = nombre_limpio
-            if contador > 1:
-                nombre_archivo_final = f"{nombre_limpio}_{contador-1}" # El primer archivo no lleva sufijo, el segundo _1, etc.
+    def _reutilizar(self, i, h, output_pdf_path):
+        if self.por_salida.get(output_pdf_path) == h and os.path.exists(output_pdf_path):
+            return 'omitida'
+        previa = next((salida for salida in self.salidas_de.get(h, ()) if os.path.exists(salida)), None)
+        if previa is None:
+            # Los archivos de la caché se sobrescribieron en esta ejecución: se guarda de nuevo
+            if self.doc is None:
+                self.doc = fitz.open(self.pdf_path)
+            if os.path.exists(output_pdf_path):
+                os.remove(output_pdf_path) # Puede ser un hardlink de otra salida: no escribir encima
+            guardar_pagina(self.doc, i, output_pdf_path, self.opciones['perfil'], self.opciones['linealizar'])
+            return ''
+        if os.path.exists(output_pdf_path):
+            os.remove(output_pdf_path)
+        try:
+            os.link(previa, output_pdf_path)
+        except OSError:
+            shutil.copy2(previa, output_pdf_path)
+        return 'enlazada'
 
-            output_pdf_path = os.path.join(output_dir, f"{nombre_archivo_final}.pdf")
+    def close(self):
+        if self.doc is not None:
+            self.doc.close()
 
-            # Crear un nuevo PDF con solo esta página
-            new_doc = fitz.open() # Documento PDF vacío
-            new_doc.insert_pdf(doc, from_page=i, to_page=i) # Insertar la página actual
-            
-            try:
-                new_doc.save(output_pdf_path)
-                print(f"Página {i+1} guardada como: {output_pdf_path}")
-            except Exception as e:
-                print(f"Error al guardar la página {i+1} ({output_pdf_path}): {e}")
-            finally:
-                new_doc.close()
-        else:
-            # Esto no debería ocurrir si se usa el nombre genérico anterior, pero por si acaso
-            print(f"Página {i+1}: No se pudo extraer un nombre.")
-            # Podrías guardar con un nombre por defecto aquí también
-            nombre_archivo_final = limpiar_nombre_archivo(f"pagina_{i+1}_error_extraccion")
-            output_pdf_path = os.path.join(output_dir, f"{nombre_archivo_final}.pdf")
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=i, to_page=i)
+def dividir_pdf(pdf_path, procesos=PROCESOS, paginas_por_bloque=PAGINAS_POR_BLOQUE,
+                modo=MODO_EXTRACCION, recorte=RECORTE_NOMBRE,
+                perfil=PERFIL_GUARDADO, linealizar=LINEALIZAR, usar_cache=CACHE_PAGINAS, log=print):
+    """
+    Extrae las páginas del PDF y las guarda con el nombre encontrado, sin interacción.
+    Con más de un proceso y documentos grandes, las páginas se reparten en bloques paralelos;
+    los nombres finales se asignan siempre en orden de página, igual que en el modo secuencial.
+    Con usar_cache, las páginas cuyo contenido no cambió desde una ejecución anterior no se
+    vuelven a extraer ni guardar.
+    Devuelve las entradas del manifiesto (una por página). Lanza una excepción si no se
+    puede abrir el PDF o crear el directorio de salida.
+    """
+    doc = fitz.open(pdf_path)
+
+    # Crear un directorio para los PDFs de salida
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    output_dir = os.path.join(os.path.dirname(pdf_path), f"{base_name}_paginas_exportadas")
+
+    opciones = {'modo': modo, 'recorte': recorte, 'perfil': perfil, 'linealizar': linealizar}
+    cache = None
+    colocador = None
+    try:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            if log:
+                log(f"Directorio de salida creado: {output_dir}")
+        elif log:
+            log(f"Directorio de salida ya existe: {output_dir}")
+
+        if usar_cache:
             try:
-                new_doc.save(output_pdf_path)
-                print(f"Página {i+1} guardada con nombre por defecto: {output_pdf_path}")
-            except Exception as e:
-                print(f"Error al guardar la página {i+1} con nombre por defecto ({output_pdf_path}): {e}")
-            finally:
-                new_doc.close()
+                cache = CachePaginas(os.path.dirname(os.path.abspath(pdf_path)))
+            except sqlite3.Error as e:
+                if log:
+                    log(f"No se pudo abrir la caché de páginas ({e}), se procesarán todas.")
+        colocador = _ColocadorPaginas(pdf_path, output_dir, opciones, cache, log)
+        # hash -> (nombre, una salida existente) para que los trabajadores decidan qué omitir
+        cache_conocida = {h: (nombre, salida) for salida, h, nombre in cache.cargar() if os.path.exists(salida)} if cache else None
 
+        if log:
+            log(f"Procesando {doc.page_count} páginas...")
+        entradas = []
 
-    doc.close()
+        if procesos > 1 and doc.page_count > paginas_por_bloque:
+            page_count = doc.page_count
+            doc.close()
+            if log:
+                log(f"Modo paralelo: {procesos} procesos, bloques de {paginas_por_bloque} páginas.")
+            bloques = [(inicio, min(inicio + paginas_por_bloque, page_count))
+                       for inicio in range(0, page_count, paginas_por_bloque)]
+            with ProcessPoolExecutor(max_workers=procesos) as executor:
+                futuros = [executor.submit(procesar_rango, pdf_path, output_dir, inicio, fin, opciones, cache_conocida)
+                           for inicio, fin in bloques]
+                # Se recorren los bloques en orden para que la numeración de duplicados sea determinista
+                for futuro in futuros:
+                    for resultado in futuro.result():
+                        entradas.append(colocador.colocar(resultado))
+            return entradas
+
+        for resultado in _iterar_rango(doc, output_dir, 0, doc.page_count, opciones, cache_conocida):
+            entradas.append(colocador.colocar(resultado))
+        return entradas
+    finally:
+        if colocador is not None:
+            colocador.close()
+        if cache is not None:
+            cache.close()
+        if not doc.is_closed:
+            doc.close()
+
+def procesar_pdf(pdf_path, procesos=PROCESOS, paginas_por_bloque=PAGINAS_POR_BLOQUE,
+                 modo=MODO_EXTRACCION, recorte=RECORTE_NOMBRE):
+    """
+    Procesa el archivo PDF arrastrado sobre el ejecutable, extrae páginas y las guarda
+    con el nombre encontrado. Espera Enter al terminar.
+    """
+    try:
+        dividir_pdf(pdf_path, procesos, paginas_por_bloque, modo, recorte)
+    except Exception as e:
+        print(f"Error al procesar el archivo PDF: {e}")
+        input("Presiona Enter para salir.")
+        return
     print("\nProceso completado.")
     input("Presiona Enter para salir.")
 
+# --- Modo por lotes (sin interacción) ---
+
+CAMPOS_MANIFIESTO = ['archivo', 'pagina', 'nombre', 'salida', 'segundos', 'error', 'cache']
+
+def buscar_pdfs(rutas):
+    """Expande directorios (recursivo) y patrones glob a una lista ordenada de PDFs sin repetidos."""
+    encontrados = []
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for root, dirs, files in os.walk(ruta):
+                # No entrar en carpetas de salida de ejecuciones anteriores
+                dirs[:] = [d for d in dirs if not d.endswith("_paginas_exportadas")]
+                encontrados.extend(os.path.join(root, f) for f in files if f.lower().endswith(".pdf"))
+        else:
+            encontrados.extend(f for f in glob.glob(ruta, recursive=True) if f.lower().endswith(".pdf"))
+    return sorted({os.path.abspath(f) for f in encontrados})
+
+def _procesar_pdf_lote(pdf_path, modo, recorte, perfil, linealizar, usar_cache):
+    """Trabajador del modo por lotes: procesa un PDF completo en secuencia y mide el tiempo."""
+    t0 = time.perf_counter()
+    try:
+        entradas = dividir_pdf(pdf_path, procesos=1, modo=modo, recorte=recorte,
+                               perfil=perfil, linealizar=linealizar, usar_cache=usar_cache, log=None)
+        error = None
+    except Exception as e:
+        entradas = []
+        error = str(e)
+    return pdf_path, entradas, error, time.perf_counter() - t0
+
+def escribir_manifiesto(entradas, ruta_manifiesto):
+    """Escribe el manifiesto en CSV o JSON según la extensión."""
+    if ruta_manifiesto.lower().endswith(".json"):
+        with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+            json.dump(entradas, f, ensure_ascii=False, indent=2)
+    else:
+        with open(ruta_manifiesto, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CAMPOS_MANIFIESTO)
+            writer.writeheader()
+            writer.writerows(entradas)
+
+def main_lote(argv):
+    """
+    Procesa varios PDFs (directorios o patrones glob) en paralelo, un archivo por proceso,
+    y escribe un único manifiesto. Devuelve 0 si todo salió bien y 1 si hubo fallos.
+    """
+    parser = argparse.ArgumentParser(prog="pdfNombres --lote", description="Divide varios PDFs por nombre sin interacción.")
+    parser.add_argument("rutas", nargs="+", help="Archivos, directorios o patrones glob (p. ej. 'nominas/*.pdf')")
+    parser.add_argument("--manifiesto", default="manifiesto_paginas.csv", help="Ruta del manifiesto (.csv o .json)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS, help="Número de PDFs procesados a la vez")
+    parser.add_argument("--modo", choices=ExtractorNombre.MODOS, default=MODO_EXTRACCION, help="Modo de extracción del nombre")
+    parser.add_argument("--recorte", type=float, nargs=4, metavar=("X0", "Y0", "X1", "Y1"), default=RECORTE_NOMBRE,
+                        help="Rectángulo para el modo 'recorte', en puntos")
+    parser.add_argument("--perfil", choices=list(PERFILES_GUARDADO), default=PERFIL_GUARDADO, help="Perfil de guardado de cada página")
+    parser.add_argument("--linealizar", action="store_true", default=LINEALIZAR, help="Guardar PDFs linealizados")
+    grupo_cache = parser.add_mutually_exclusive_group()
+    grupo_cache.add_argument("--con-cache", dest="cache", action="store_true",
+                             help="Reutilizar las páginas que no cambiaron desde la ejecución anterior")
+    grupo_cache.add_argument("--sin-cache", dest="cache", action="store_false",
+                             help="Procesar todas las páginas aunque no hayan cambiado")
+    parser.set_defaults(cache=CACHE_PAGINAS)
+    args = parser.parse_args(argv)
+
+    pdfs = buscar_pdfs(args.rutas)
+    if not pdfs:
+        print("No se encontraron archivos PDF.")
+        return 1
+    print(f"Procesando {len(pdfs)} PDFs con {args.procesos} procesos...")
+
+    entradas = []
+    fallos = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.procesos)) as executor:
+        futuros = [executor.submit(_procesar_pdf_lote, pdf, args.modo, args.recorte, args.perfil, args.linealizar,
+                                   args.cache) for pdf in pdfs]
+        for futuro in as_completed(futuros):
+            pdf_path, entradas_pdf, error, segundos = futuro.result()
+            if error is not None:
+                fallos += 1
+                print(f"ERROR {pdf_path}: {error}")
+                entradas.append({'archivo': pdf_path, 'pagina': '', 'nombre': '', 'salida': '',
+                                 'segundos': round(segundos, 4), 'error': error, 'cache': ''})
+                continue
+            errores_pagina = sum(1 for e in entradas_pdf if e['error'])
+            fallos += errores_pagina
+            paginas = len(entradas_pdf)
+            reutilizadas = sum(1 for e in entradas_pdf if e['cache'])
+            ritmo = paginas / segundos if segundos > 0 else 0
+            print(f"OK {pdf_path}: {paginas} páginas en {segundos:.1f} s ({ritmo:.1f} páginas/s)"
+                  + (f", {reutilizadas} sin cambios" if reutilizadas else "")
+                  + (f", {errores_pagina} errores" if errores_pagina else ""))
+            entradas.extend(entradas_pdf)
+
+    # Orden estable en el manifiesto sin importar qué proceso terminó primero
+    entradas.sort(key=lambda e: (e['archivo'], e['pagina'] if e['pagina'] != '' else 0))
+    escribir_manifiesto(entradas, args.manifiesto)
+    print(f"Manifiesto guardado en: {args.manifiesto}")
+    print(f"Tiempo total: {time.perf_counter() - t0:.1f} s. Fallos: {fallos}")
+    return 1 if fallos else 0
+
+def comparar_perfiles(pdf_path, max_paginas=200):
+    """
+    Benchmark: guarda las primeras max_paginas páginas con cada perfil en una carpeta temporal
+    y muestra bytes escritos y segundos por página.
+    """
+    doc = fitz.open(pdf_path)
+    paginas = min(doc.page_count, max_paginas)
+    print(f"Benchmark de guardado: {pdf_path} ({paginas} páginas)")
+    print(f"{'Perfil':<16}{'Bytes totales':>16}{'Bytes/página':>15}{'s/página':>12}")
+    try:
+        for perfil in PERFILES_GUARDADO:
+            with tempfile.TemporaryDirectory() as tmp:
+                total_bytes = 0
+                t0 = time.perf_counter()
+                for i in range(paginas):
+                    ruta = os.path.join(tmp, f"{i}.pdf")
+                    guardar_pagina(doc, i, ruta, perfil, linealizar=False)
+                    total_bytes += os.path.getsize(ruta)
+                segundos = time.perf_counter() - t0
+            print(f"{perfil:<16}{total_bytes:>16,}{total_bytes // max(paginas, 1):>15,}{segundos / max(paginas, 1):>12.4f}")
+    finally:
+        doc.close()
+
 if __name__ == "__main__":
+    freeze_support() # Necesario para el pool de procesos en el ejecutable de Windows
+    if len(sys.argv) > 1 and sys.argv[1] == "--lote":
+        # Uso: pdfNombres.py --lote <archivos|carpetas|patrones> [--manifiesto m.csv|m.json] [--procesos N]
+        sys.exit(main_lote(sys.argv[2:]))
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        # Uso: pdfNombres.py --benchmark archivo.pdf
+        comparar_perfiles(sys.argv[2])
+        sys.exit(0)
     if len(sys.argv) > 1:
         pdf_file_path = sys.argv[1]
         print(f"Archivo PDF recibido: {pdf_file_path}")
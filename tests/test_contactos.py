@@ -0,0 +1,127 @@
+"""Paridad entre la lectura con pandas y el modo streaming de contactos.run_formatter."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import contactos
+
+openpyxl = pytest.importorskip("openpyxl")
+
+# Textos que pandas lee como vacíos por defecto, mezclados con datos reales
+FILAS = [
+    ["1 Dr.", "Juan Pérez", "555 123 4567", "ami", None, "Prospecto", None],
+    [None, "NA", "N/A", None, None, "#N/A", None],
+    ["null", None, "n/a", "NULL", None, None, None],
+    ["2", "Lic.", "Ana López", "5559876543", "ami", None, "Cerrado"],
+    [None, "nan", "None", "-nan", "<NA>", "#NA", "NaN"],
+    ["3", None, "Luis NA", "555-000-1111", None, None, "1.#IND"],
+    ["NA", "Sra.", "Eva Ruiz", None, "ami", None, "Propuesta"],
+    [None, None, "#N/A N/A", "5551112222", None, None, None],
+]
+
+
+@pytest.fixture
+def libro(tmp_path):
+    ruta = tmp_path / "campana.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Hoja1"
+    ws.append(["Campaña"])
+    ws.append(["Serial", "Título", "Contacto", "Teléfono", "Vendedor", "Etapa", "Notas"])
+    for fila in FILAS:
+        ws.append(fila)
+    wb.save(ruta)
+    return str(ruta)
+
+
+def test_na_strings_es_copia_de_pandas():
+    assert {"NA", "N/A", "#N/A", "null", "nan", "None", "<NA>"} <= contactos.NA_STRINGS
+
+
+def test_streaming_igual_que_pandas_con_valores_na(libro):
+    con_pandas = contactos.run_formatter(libro, "Hoja1")
+    en_streaming = contactos.run_formatter(libro, "Hoja1", streaming=True)
+    assert not con_pandas.empty
+    assert con_pandas.fillna("").to_dict("records") == en_streaming.fillna("").to_dict("records")
+
+
+def test_iter_records_trata_na_como_vacio():
+    registros = list(contactos.iter_records([
+        ("1", "Dr.", "Juan Pérez", "NA", "ami", "null", None),
+        ("NA", "#N/A", "n/a", None, "None", "", None),
+    ]))
+    assert len(registros) == 1
+    assert "NA" not in registros[0].values()
+    assert "null" not in registros[0].values()
+
+
+# Teléfonos numéricos en columnas con huecos: pandas los lee como float (5551234567.0)
+FILAS_NUMERICAS = [
+    [1, "Dr.", "Juan Pérez", 5551234567, "ami", None, "Prospecto"],
+    [None, None, None, 5557654321, None, None, None],
+    [2, "Lic.", "Ana López", None, "ami", None, "Cerrado"],
+    [None, None, 5559876543, None, None, None, None],
+    [3, None, "Luis Gómez", 5550001111.0, None, 0, "Propuesta"],
+    [None, None, "Eva Ruiz", 12.5, "ami", None, None],
+]
+
+
+@pytest.fixture
+def libro_numerico(tmp_path):
+    ruta = tmp_path / "campana_numerica.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Hoja1"
+    ws.append(["Campaña"])
+    ws.append(["Serial", "Título", "Contacto", "Teléfono", "Vendedor", "Etapa", "Notas"])
+    for fila in FILAS_NUMERICAS:
+        ws.append(fila)
+    wb.save(ruta)
+    return str(ruta)
+
+
+def test_streaming_igual_que_pandas_con_telefonos_numericos(libro_numerico):
+    con_pandas = contactos.run_formatter(libro_numerico, "Hoja1")
+    en_streaming = contactos.run_formatter(libro_numerico, "Hoja1", streaming=True)
+    assert not con_pandas.empty
+    assert con_pandas.fillna("").to_dict("records") == en_streaming.fillna("").to_dict("records")
+    telefonos = " ".join(con_pandas["Teléfono"].fillna(""))
+    assert "5551234567" in telefonos
+    assert ".0" not in telefonos
+
+
+def test_cell_text_floats_enteros():
+    assert contactos.cell_text(5551234567.0) == "5551234567"
+    assert contactos.cell_text(12.5) == "12.5"
+    assert contactos.cell_text(float("nan")) == ""
+    assert contactos.cell_text(None) == ""
+    assert contactos.cell_text(" 7 ") == "7"
+
+
+def _guardar_libro(ruta, filas):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Hoja1"
+    ws.append(["Campaña"])
+    ws.append(["Serial", "Título", "Contacto", "Teléfono", "Vendedor", "Etapa", "Notas"])
+    for fila in filas:
+        ws.append(fila)
+    wb.save(ruta)
+
+
+def test_lote_distingue_libros_homonimos(tmp_path):
+    for carpeta in ("norte", "sur"):
+        (tmp_path / carpeta).mkdir()
+        _guardar_libro(tmp_path / carpeta / "campana.xlsx", FILAS_NUMERICAS)
+    salida = tmp_path / "salida.csv"
+    assert contactos.main_lote([str(tmp_path), "--salida", str(salida), "--procesos", "1"]) == 0
+    archivos = set(contactos.pd.read_csv(salida)["Archivo"])
+    assert archivos == {os.path.join("norte", "campana.xlsx"), os.path.join("sur", "campana.xlsx")}
+
+
+def test_source_names_un_solo_libro():
+    ruta = os.path.abspath(os.path.join("datos", "campana.xlsx"))
+    assert contactos.source_names([ruta]) == {ruta: "campana.xlsx"}
@@ -0,0 +1,34 @@
+"""Tipos de celda de la escritura en bloque de migrar_campana."""
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrar_campana
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    (1.5, '<c r="A2"><v>1.5</v></c>'),
+    (np.float64(1.5), '<c r="A2"><v>1.5</v></c>'),
+    (np.float32(0.5), '<c r="A2"><v>0.5</v></c>'),
+    (3, '<c r="A2"><v>3</v></c>'),
+    (np.int64(4), '<c r="A2"><v>4</v></c>'),
+    (Decimal("2.25"), '<c r="A2"><v>2.25</v></c>'),
+    (True, '<c r="A2" t="b"><v>1</v></c>'),
+    (np.bool_(False), '<c r="A2" t="b"><v>0</v></c>'),
+    (float("nan"), ""),
+    (np.float64("inf"), ""),
+    (None, ""),
+    ("", ""),
+])
+def test_cell_xml_escalares(valor, esperado):
+    assert migrar_campana._cell_xml("A2", valor) == esperado
+
+
+def test_cell_xml_texto():
+    assert migrar_campana._cell_xml("B3", "a&b") == (
+        '<c r="B3" t="inlineStr"><is><t xml:space="preserve">a&amp;b</t></is></c>')